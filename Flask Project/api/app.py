@@ -5,6 +5,7 @@ This module provides the REST API endpoints:
 - GET /health - Health check
 - POST /api/merchant/register - Register merchant products
 - POST /api/recommend - Get personalized recommendations
+- POST /api/merchant/register_and_recommend - Register, then recommend, in one call
 - POST /api/popular - Get popular products (cold start)
 
 The API is designed to be called from a Shopify Remix app (Node.js)
@@ -13,7 +14,7 @@ to provide AI-powered product recommendations.
 
 import logging
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from functools import wraps
 
 from flask import Flask, request, jsonify
@@ -21,6 +22,7 @@ from flask_cors import CORS
 
 # Import recommendation components
 from src.recommender import get_recommender
+from src.category_classifier import preload_category_classifier
 from src.model_loader import get_model_loader
 from config import API_CONFIG, LOGGING_CONFIG, DEFAULT_K, MAX_K
 
@@ -32,14 +34,164 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def create_app() -> Flask:
+def validate_and_register(data: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """
+    Validate a /api/merchant/register payload and register its products.
+    
+    Args:
+        data: Parsed JSON request body (None if missing or invalid)
+        
+    Returns:
+        Tuple of (response body, HTTP status)
+    """
+    try:
+        if not data:
+            return {
+                "success": False,
+                "error": "No JSON data provided"
+            }, 400
+        
+        merchant_id = data.get("merchant_id")
+        products = data.get("products", [])
+        
+        if not merchant_id:
+            return {
+                "success": False,
+                "error": "merchant_id is required"
+            }, 400
+        
+        if not products:
+            return {
+                "success": False,
+                "error": "products list is required and cannot be empty"
+            }, 400
+        
+        # Register products
+        recommender = get_recommender()
+        result = recommender.register_merchant_products(merchant_id, products)
+        
+        return {
+            "success": True,
+            **result
+        }, 200
+        
+    except Exception as e:
+        logger.error(f"Error registering merchant: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }, 500
+
+
+def validate_recommend_payload(data: Optional[Dict[str, Any]]) -> Optional[Tuple[str, int]]:
+    """
+    Check a /api/recommend payload without touching the recommender.
+    
+    Args:
+        data: Parsed JSON request body (None if missing or invalid)
+        
+    Returns:
+        Tuple of (error message, HTTP status) if the payload is invalid,
+        None otherwise
+    """
+    if not data:
+        return "No JSON data provided", 400
+    
+    if not data.get("merchant_id"):
+        return "merchant_id is required", 400
+    
+    try:
+        int(data.get("k", DEFAULT_K))
+    except (TypeError, ValueError):
+        return "k must be an integer", 400
+    
+    return None
+
+
+def validate_and_recommend(data: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """
+    Validate a /api/recommend payload and compute its recommendations.
+    
+    Args:
+        data: Parsed JSON request body (None if missing or invalid)
+        
+    Returns:
+        Tuple of (response body, HTTP status)
+    """
+    try:
+        error = validate_recommend_payload(data)
+        if error:
+            message, status = error
+            return {
+                "success": False,
+                "error": message
+            }, status
+        
+        # Extract required parameters
+        merchant_id = data.get("merchant_id")
+        current_product_id = data.get("current_product_id")
+        
+        # Extract optional parameters
+        user_history = data.get("user_history")
+        user_location = data.get("user_location")
+        user_preferences = data.get("user_preferences")
+        merchant_settings = data.get("merchant_settings")
+
+        logger.debug(f"Received merchant settings: {merchant_settings}")
+
+        k = data.get("k", DEFAULT_K)
+        exclude_current = data.get("exclude_current", True)
+        exclude_viewed = data.get("exclude_viewed", False) # Default stayed false to avoid breaking
+        exclude_purchased = data.get("exclude_purchased", True)
+            
+        # Validate k
+        k = min(max(1, int(k)), MAX_K)
+        
+        # Get recommendations
+        recommender = get_recommender()
+        recommendations = recommender.get_recommendations(
+            merchant_id=merchant_id,
+            current_product_id=current_product_id,
+            user_history=user_history,
+            user_location=user_location,
+            user_preferences=user_preferences,
+            k=k,
+            exclude_current=exclude_current,
+            exclude_viewed=exclude_viewed,
+            exclude_purchased=exclude_purchased,
+            merchant_settings=merchant_settings
+        )
+            
+        return {
+            "success": True,
+            "recommendations": recommendations,
+            "count": len(recommendations)
+        }, 200
+        
+    except Exception as e:
+        logger.error(f"Error getting recommendations: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "recommendations": [],
+            "count": 0
+        }, 500
+
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
     """
     Create and configure the Flask application.
     
+    Args:
+        config: Optional Flask config overrides (e.g. {"TESTING": True}),
+            applied before any route runs
+    
     Returns:
         Configured Flask app instance
     """
     app = Flask(__name__)
+    if config:
+        app.config.update(config)
     
     # Enable CORS for all routes (required for Shopify Remix app)
     CORS(app, resources={
@@ -50,6 +202,12 @@ def create_app() -> Flask:
         }
     })
     
+    # Opt-in warm start: load the saved category classifier (and with it
+    # scikit-learn) now instead of on the first request that detects a
+    # category. Never trains or writes the model file.
+    if app.config.get("PRELOAD_CATEGORY_CLASSIFIER", API_CONFIG["preload_classifier"]):
+        preload_category_classifier()
+    
     # Initialize model loader and recommender
     @app.before_request
     def initialize_on_first_request():
@@ -181,45 +339,8 @@ def create_app() -> Flask:
             "merchant_id": "store.myshopify.com"
         }
         """
-        try:
-            data = request.get_json()
-            
-            if not data:
-                return jsonify({
-                    "success": False,
-                    "error": "No JSON data provided"
-                }), 400
-            
-            merchant_id = data.get("merchant_id")
-            products = data.get("products", [])
-            
-            if not merchant_id:
-                return jsonify({
-                    "success": False,
-                    "error": "merchant_id is required"
-                }), 400
-            
-            if not products:
-                return jsonify({
-                    "success": False,
-                    "error": "products list is required and cannot be empty"
-                }), 400
-            
-            # Register products
-            recommender = get_recommender()
-            result = recommender.register_merchant_products(merchant_id, products)
-            
-            return jsonify({
-                "success": True,
-                **result
-            }), 200
-            
-        except Exception as e:
-            logger.error(f"Error registering merchant: {e}")
-            return jsonify({
-                "success": False,
-                "error": str(e)
-            }), 500
+        body, status = validate_and_register(request.get_json(silent=True))
+        return jsonify(body), status
     
     # ==========================================================================
     # RECOMMENDATIONS ENDPOINT
@@ -279,73 +400,46 @@ def create_app() -> Flask:
             "count": 10
         }
         """
-        try:
-            data = request.get_json()
-            
-            if not data:
-                return jsonify({
-                    "success": False,
-                    "error": "No JSON data provided"
-                }), 400
-            
-            # Extract required parameters
-            merchant_id = data.get("merchant_id")
-            current_product_id = data.get("current_product_id")
-            
-            if not merchant_id:
-                return jsonify({
-                    "success": False,
-                    "error": "merchant_id is required"
-                }), 400
-            
-            # Extract optional parameters
-            current_product_id = data.get("current_product_id") 
-            
-            # Extract optional parameters
-            user_history = data.get("user_history")
-            user_location = data.get("user_location")
-            user_preferences = data.get("user_preferences")
-            merchant_settings = data.get("merchant_settings")
-
-            logger.info(f"API DEBUG: Received settings: {merchant_settings}") # Added debug log
-
-            k = data.get("k", DEFAULT_K)
-            exclude_current = data.get("exclude_current", True)
-            exclude_viewed = data.get("exclude_viewed", False) # Default stayed false to avoid breaking
-            exclude_purchased = data.get("exclude_purchased", True)
-            
-            # Validate k
-            k = min(max(1, int(k)), MAX_K)
-            
-            # Get recommendations
-            recommender = get_recommender()
-            recommendations = recommender.get_recommendations(
-                merchant_id=merchant_id,
-                current_product_id=current_product_id,
-                user_history=user_history,
-                user_location=user_location,
-                user_preferences=user_preferences,
-                k=k,
-                exclude_current=exclude_current,
-                exclude_viewed=exclude_viewed,
-                exclude_purchased=exclude_purchased,
-                merchant_settings=merchant_settings
-            )
-            
-            return jsonify({
-                "success": True,
-                "recommendations": recommendations,
-                "count": len(recommendations)
-            }), 200
-            
-        except Exception as e:
-            logger.error(f"Error getting recommendations: {e}")
+        body, status = validate_and_recommend(request.get_json(silent=True))
+        return jsonify(body), status
+    
+    @app.route("/api/merchant/register_and_recommend", methods=["POST"])
+    @timed_request
+    def register_and_recommend():
+        """
+        Register a merchant's products and get recommendations in one call.
+        
+        Saves a round trip when products are (re)synced right before the
+        first recommendation request, e.g. in tests or after a webhook sync.
+        
+        Request Body:
+        {
+            "merchant_id": "store.myshopify.com",
+            "products": [...],  // as for /api/merchant/register
+            "query": {          // as for /api/recommend (merchant_id implied)
+                "current_product_id": "gid://shopify/Product/123",
+                "k": 10
+            }
+        }
+        
+        Returns:
+            JSON with the registration summary plus "recommendations" and "count"
+        """
+        data = request.get_json(silent=True)
+        query = data.get("query") if isinstance(data, dict) else None
+        if query is not None and not isinstance(query, dict):
             return jsonify({
                 "success": False,
-                "error": str(e),
-                "recommendations": [],
-                "count": 0
-            }), 500
+                "error": "query must be a JSON object"
+            }), 400
+        
+        body, status = validate_and_register(data)
+        if status != 200:
+            return jsonify(body), status
+        
+        query = {**(query or {}), "merchant_id": data["merchant_id"]}
+        recommendations, status = validate_and_recommend(query)
+        return jsonify({**body, **recommendations}), status
     
     # ==========================================================================
     # POPULAR PRODUCTS ENDPOINT (Cold Start)
@@ -483,6 +577,11 @@ def create_app() -> Flask:
             
             recommender = get_recommender()
             products = recommender.get_merchant_products(merchant_id, category)
+            # Hide internal bookkeeping fields (e.g. "_sid")
+            products = [
+                {key: value for key, value in p.items() if not key.startswith("_")}
+                for p in products
+            ]
             
             return jsonify({
                 "success": True,
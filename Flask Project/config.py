@@ -123,7 +123,7 @@ HOT_CLIMATE_REGIONS = [
     "australia", "fiji", "hawaii",
 ]
 
-COLD_CLIMATE_REGIONS = [
+COLD_CLIMATE_REGIONS = [
     # North America
     "canada", "alaska",
     # Europe
@@ -134,27 +134,27 @@ COLD_CLIMATE_REGIONS = [
     # Asia
     "japan", "south korea", "mongolia", "kazakhstan",
     # Southern Hemisphere Winter
-    "argentina", "chile", "new zealand",
-]
-
-# ISO 3166-1 alpha-2 shortcuts used by Shopify localization.country.iso_code.
-# Kept lowercase to match normalized request values.
-HOT_CLIMATE_ISO_CODES = {
-    "pk", "in", "bd", "lk", "np",
-    "ae", "sa", "qa", "bh", "kw", "om", "ye", "jo", "iq",
-    "th", "vn", "ph", "id", "my", "sg", "kh", "mm", "la",
-    "eg", "ng", "ke", "za", "ma", "gh", "et", "tz", "ug", "sn",
-    "br", "mx", "co", "ve", "pe", "ec", "cu", "do", "pr", "jm",
-    "au", "fj",
-}
-
-COLD_CLIMATE_ISO_CODES = {
-    "ca", "gb", "ie",
-    "no", "se", "fi", "dk", "is",
-    "ru", "pl", "de", "nl", "be", "ch", "at", "cz",
-    "jp", "kr", "mn", "kz",
-    "ar", "cl", "nz",
-}
+    "argentina", "chile", "new zealand",
+]
+
+# ISO 3166-1 alpha-2 shortcuts used by Shopify localization.country.iso_code.
+# Kept lowercase to match normalized request values.
+HOT_CLIMATE_ISO_CODES = {
+    "pk", "in", "bd", "lk", "np",
+    "ae", "sa", "qa", "bh", "kw", "om", "ye", "jo", "iq",
+    "th", "vn", "ph", "id", "my", "sg", "kh", "mm", "la",
+    "eg", "ng", "ke", "za", "ma", "gh", "et", "tz", "ug", "sn",
+    "br", "mx", "co", "ve", "pe", "ec", "cu", "do", "pr", "jm",
+    "au", "fj",
+}
+
+COLD_CLIMATE_ISO_CODES = {
+    "ca", "gb", "ie",
+    "no", "se", "fi", "dk", "is",
+    "ru", "pl", "de", "nl", "be", "ch", "at", "cz",
+    "jp", "kr", "mn", "kz",
+    "ar", "cl", "nz",
+}
 
 # Tags to filter for hot climate users (skip winter items)
 WINTER_TAGS = [
@@ -242,6 +242,33 @@ PRICE_PROXIMITY_WEIGHT = 0.10
 # Price window: candidates within ±30% of current product price get a bonus
 PRICE_PROXIMITY_RANGE = 0.30
 
+# Registration: product vectors are built with a thread pool once a merchant
+# has at least this many distinct representative sets
+PARALLEL_INDEXING_MIN_PRODUCTS = 256
+INDEXING_WORKERS = int(os.getenv("INDEXING_WORKERS", os.cpu_count() or 1))
+
+# Popular-products responses are cached per merchant snapshot and request
+# arguments for this many seconds (0 disables the cache)
+POPULAR_CACHE_TTL_SECONDS = float(os.getenv("POPULAR_CACHE_TTL_SECONDS", 300))
+POPULAR_CACHE_MAX_ENTRIES = 1024
+
+# Amazon embeddings memoized per recommender (least recently used evicted)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 4096))
+
+# Scoring: merchants with at least this many products get a FAISS
+# IndexFlatIP; requests with this many candidates shortlist the top
+# k * FAISS_SEARCH_OVERSAMPLE by similarity before boosting
+FAISS_SEARCH_MIN_CANDIDATES = int(os.getenv("FAISS_SEARCH_MIN_CANDIDATES", 20000))
+FAISS_SEARCH_OVERSAMPLE = 4
+# Beyond this many products the index is an IndexIVFFlat (nlist = sqrt(N))
+# probing FAISS_IVF_NPROBE lists per search instead of an exact flat scan
+FAISS_IVF_MIN_PRODUCTS = int(os.getenv("FAISS_IVF_MIN_PRODUCTS", 100000))
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", 16))
+# Optional compressed storage for the FAISS index: "fp16" or "8bit".
+# Only the shortlist search reads it; shortlisted candidates are still
+# scored against the float32 matrix.
+FAISS_SCALAR_QUANTIZER = os.getenv("FAISS_SCALAR_QUANTIZER", "").lower() or None
+
 
 # =============================================================================
 # API CONFIGURATION
@@ -251,6 +278,9 @@ API_CONFIG = {
     "host": os.getenv("FLASK_HOST", "0.0.0.0"),
     "port": int(os.getenv("FLASK_PORT", 5001)),
     "debug": os.getenv("FLASK_DEBUG", "false").lower() == "true",
+    # Load the saved category classifier when the app is created rather
+    # than on the first request that needs it (never trains or writes it)
+    "preload_classifier": os.getenv("PRELOAD_CATEGORY_CLASSIFIER", "false").lower() == "true",
 }
 
 
@@ -262,3 +292,7 @@ LOGGING_CONFIG = {
     "level": os.getenv("LOG_LEVEL", "INFO"),
     "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 }
+
+# Optional product ID traced through filtering and scoring in the logs.
+# Either the bare numeric ID or its "gid://shopify/Product/<id>" form works.
+DEBUG_TRACE_PRODUCT_ID = os.getenv("DEBUG_TRACE_PRODUCT_ID") or None
@@ -14,16 +14,15 @@ Model size: ~50 KB (pickle).  Inference: < 1 ms.  Zero deployment cost.
 import logging
 import pickle
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.svm import LinearSVC
-from sklearn.calibration import CalibratedClassifierCV
-from sklearn.pipeline import Pipeline
 
 from config import CATEGORY_KEYWORDS
 
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
 logger = logging.getLogger(__name__)
 
 # Default path to persist the trained model
@@ -55,7 +54,7 @@ class CategoryClassifier:
 
     def __init__(self, model_path: Optional[Path] = None):
         self.model_path = model_path or _DEFAULT_MODEL_PATH
-        self._pipeline: Optional[Pipeline] = None
+        self._pipeline: Optional["Pipeline"] = None
         self._categories: List[str] = []
         self._is_trained = False
 
@@ -71,6 +70,14 @@ class CategoryClassifier:
             keywords_map: ``{category: [keyword, ...]}`` — defaults to
                 ``CATEGORY_KEYWORDS`` from config.
         """
+        # scikit-learn takes ~1.5 s to import, so it is only imported here
+        # (or by unpickling a saved pipeline) rather than with this module,
+        # which every API process and test worker imports at startup
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.svm import LinearSVC
+        from sklearn.calibration import CalibratedClassifierCV
+        from sklearn.pipeline import Pipeline
+
         keywords_map = keywords_map or CATEGORY_KEYWORDS
         texts, labels = self._build_training_data(keywords_map)
 
@@ -290,3 +297,23 @@ def get_category_classifier() -> CategoryClassifier:
             _instance.train()
             _instance.save()
     return _instance
+
+
+def preload_category_classifier() -> bool:
+    """
+    Load the saved classifier into the singleton ahead of the first request.
+
+    Unlike get_category_classifier() this never trains or writes the model
+    file: when no usable ``model/category_classifier.pkl`` exists it does
+    nothing and the first category detection trains as usual.
+
+    Returns:
+        True if the singleton holds a trained classifier afterwards
+    """
+    global _instance
+    if _instance is None:
+        classifier = CategoryClassifier()
+        if not classifier.load():
+            return False
+        _instance = classifier
+    return True
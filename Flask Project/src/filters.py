@@ -11,7 +11,12 @@ recommendations match user preferences and constraints.
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+import re
+import sys
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, Any, Optional, Pattern, Tuple, Union
+
+import numpy as np
 
 # Import configuration
 from config import (
@@ -24,10 +29,20 @@ from config import (
     VEGAN_TAGS,
     SUSTAINABLE_TAGS,
     PRICE_RANGES,
+    DEBUG_TRACE_PRODUCT_ID,
 )
 
 logger = logging.getLogger(__name__)
 
+# Keyword groups the location and ethical filters match against; each one
+# becomes a bool column in build_filter_columns()
+TAG_GROUPS = {
+    "winter": WINTER_TAGS,
+    "summer": SUMMER_TAGS,
+    "vegan": VEGAN_TAGS,
+    "sustainable": SUSTAINABLE_TAGS,
+}
+
 
 def _normalize_location(location: str) -> str:
     """
@@ -44,6 +59,17 @@ def _normalize_location(location: str) -> str:
     return location.lower().strip()
 
 
+@lru_cache(maxsize=1024)
+def _normalize_category(category: str) -> str:
+    """
+    Lowercase, stripped category name, interned.
+    
+    Merchants only have a handful of distinct category strings, so each
+    is normalized once and equal categories compare by identity.
+    """
+    return sys.intern(category.lower().strip())
+
+
 def _get_product_tags(product: Dict[str, Any]) -> List[str]:
     """
     Extract and normalize tags from a product.
@@ -65,6 +91,58 @@ def _get_product_tags(product: Dict[str, Any]) -> List[str]:
     return [str(t).lower().strip() for t in tags if t]
 
 
+def normalize_tag_list(tags: Any) -> List[str]:
+    """
+    Canonical list form of a product's 'tags' field.
+    
+    Accepts a list or a comma-separated string (or None) and returns the
+    stripped, non-empty tags as strings, keeping their original case.
+    
+    Args:
+        tags: Raw 'tags' value from a product
+        
+    Returns:
+        List of tag strings
+    """
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return [tag for tag in (str(t).strip() for t in tags) if tag]
+
+
+def normalize_product_tags(product: Dict[str, Any]) -> FrozenSet[str]:
+    """
+    Canonical tag set of a product (precomputed at registration when available).
+    
+    Args:
+        product: Product dictionary with 'tags' field
+        
+    Returns:
+        Frozenset of lowercase, stripped tags
+    """
+    tag_set = product.get("_tag_set")
+    if tag_set is None:
+        tag_set = frozenset(_get_product_tags(product))
+    return tag_set
+
+
+def precompute_match_fields(product: Dict[str, Any]) -> None:
+    """
+    Store a product's normalized tags and match text on the product.
+    
+    Sets ``_tag_set`` (see normalize_product_tags) and ``_text`` (see
+    _get_product_text) so filters and tag boosts don't re-split and
+    re-lowercase the same fields on every request. Call again whenever
+    the title, product_type or tags change.
+    
+    Args:
+        product: Product dictionary, updated in place
+    """
+    product["_tag_set"] = frozenset(_get_product_tags(product))
+    product["_text"] = _build_product_text(product)
+
+
 def _get_product_text(product: Dict[str, Any]) -> str:
     """
     Get combined text from product for matching.
@@ -78,6 +156,14 @@ def _get_product_text(product: Dict[str, Any]) -> str:
     Returns:
         Combined lowercase text
     """
+    text = product.get("_text")
+    if text is None:
+        text = _build_product_text(product)
+    return text
+
+
+def _build_product_text(product: Dict[str, Any]) -> str:
+    """Build the match text of _get_product_text() from the raw fields."""
     parts = [
         product.get("title", ""),
         product.get("product_type", ""),
@@ -90,6 +176,22 @@ def _get_product_text(product: Dict[str, Any]) -> str:
     return " ".join(str(p).lower() for p in parts if p)
 
 
+@lru_cache(maxsize=None)
+def _compile_tag_pattern(target_tags: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    """
+    Compile a tag list into one regex alternation.
+    
+    Matching is still plain substring search (tags are escaped), but a
+    single compiled scan replaces one ``in`` test per tag.
+    
+    Returns:
+        Compiled pattern, or None for an empty tag list
+    """
+    if not target_tags:
+        return None
+    return re.compile("|".join(re.escape(tag.lower()) for tag in target_tags))
+
+
 def _has_any_tag(product: Dict[str, Any], target_tags: List[str]) -> bool:
     """
     Check if product has any of the target tags.
@@ -104,52 +206,128 @@ def _has_any_tag(product: Dict[str, Any], target_tags: List[str]) -> bool:
     Returns:
         True if any target tag is found
     """
-    product_text = _get_product_text(product)
+    return _matches_pattern(product, _compile_tag_pattern(tuple(target_tags)))
+
+
+def _matches_pattern(product: Dict[str, Any], pattern: Optional[Pattern[str]]) -> bool:
+    """Check if a compiled tag pattern occurs anywhere in the product text."""
+    if pattern is None:
+        return False
+    return pattern.search(_get_product_text(product)) is not None
+
+
+def build_filter_columns(products: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Lay out the fields the filters read as per-product columns.
     
-    for tag in target_tags:
-        if tag.lower() in product_text:
-            return True
+    Passing (a row subset of) these columns to apply_all_filters() turns
+    every filter into a vectorized mask, so the product dicts are only
+    touched for prices that are not plain numbers.
     
-    return False
+    Args:
+        products: List of product dictionaries
+        
+    Returns:
+        Dict of aligned arrays: "category" (normalized names, object),
+        "price" (float64, NaN where not a plain number) and one bool
+        array per TAG_GROUPS group (same substring matching as the filters)
+    """
+    patterns = {
+        group: _compile_tag_pattern(tuple(tags)) for group, tags in TAG_GROUPS.items()
+    }
+    columns: Dict[str, np.ndarray] = {
+        group: np.zeros(len(products), dtype=bool) for group in TAG_GROUPS
+    }
+    categories = np.empty(len(products), dtype=object)
+    prices = np.empty(len(products), dtype=np.float64)
+    
+    for row, product in enumerate(products):
+        categories[row] = _normalize_category(str(product.get("category", "")))
+        prices[row] = _parse_plain_price(product)
+        text = _get_product_text(product)
+        for group, pattern in patterns.items():
+            if pattern is not None and pattern.search(text):
+                columns[group][row] = True
+    
+    columns["category"] = categories
+    columns["price"] = prices
+    return columns
 
 
-def apply_location_filter(
+def _tag_group_matcher(group: str) -> Callable[[Dict[str, Any]], bool]:
+    """Return a predicate testing whether a product matches a keyword group."""
+    pattern = _compile_tag_pattern(tuple(TAG_GROUPS[group]))
+    return lambda product: _matches_pattern(product, pattern)
+
+
+def _product_id(product: Dict[str, Any]) -> str:
+    """Canonical string ID (precomputed at registration when available)."""
+    sid = product.get("_sid")
+    return sid if sid is not None else str(product.get("id"))
+
+
+# (stage name, per-product predicate, optional vectorized mask)
+FilterStage = Tuple[str, Callable[[Dict[str, Any]], bool], Optional[np.ndarray]]
+
+
+def _log_trace_drop(
     products: List[Dict[str, Any]],
-    user_location: Optional[str]
-) -> List[Dict[str, Any]]:
+    rows: Optional[np.ndarray],
+    stages: List[FilterStage]
+) -> None:
+    """Log the first filter stage that drops DEBUG_TRACE_PRODUCT_ID."""
+    if not DEBUG_TRACE_PRODUCT_ID:
+        return
+    candidates = products if rows is None else (products[row] for row in rows)
+    for product in candidates:
+        if _product_id(product) != DEBUG_TRACE_PRODUCT_ID:
+            continue
+        for stage, predicate, _ in stages:
+            if not predicate(product):
+                logger.info(f"DEBUG: Missing Product DROPPED by {stage}")
+                return
+        return
+
+
+def _log_stage_counts(
+    products: List[Dict[str, Any]],
+    rows: Optional[np.ndarray],
+    stages: List[FilterStage]
+) -> None:
     """
-    Filter products based on user's location/climate.
+    Log how many products survive each filter stage, in order.
     
-    For users in hot climates (Pakistan, India, UAE, etc.):
-    - Excludes winter items (wool coats, snow boots, etc.)
-    
-    For users in cold climates (Canada, UK, Russia, etc.):
-    - Excludes summer-only items (swimwear, beach items, etc.)
+    Only runs at DEBUG level: the fused pipeline never materializes the
+    per-stage survivors, so counting them costs an extra pass per stage.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    alive = np.ones(len(products) if rows is None else len(rows), dtype=bool)
+    for stage, predicate, mask in stages:
+        before = int(alive.sum())
+        if mask is not None:
+            alive &= mask
+        else:
+            for i in np.flatnonzero(alive):
+                alive[i] = predicate(products[i if rows is None else rows[i]])
+        logger.debug(f"{stage}: {before} → {int(alive.sum())} products")
+
+
+def _climate_exclude_group(user_location: str) -> Optional[str]:
+    """
+    Keyword group to exclude for a user's climate.
     
     Args:
-        products: List of product dictionaries to filter
         user_location: User's country/region (e.g., "Pakistan", "Canada")
         
     Returns:
-        Filtered list of products appropriate for the climate
-        
-    Example:
-        >>> products = [
-        ...     {"id": "1", "title": "Wool Winter Coat", "tags": ["winter", "coat"]},
-        ...     {"id": "2", "title": "Organic Moisturizer", "tags": ["skincare"]},
-        ... ]
-        >>> filtered = apply_location_filter(products, "Pakistan")
-        >>> len(filtered)  # Only moisturizer, wool coat filtered out
-        1
+        "winter" for hot climates, "summer" for cold ones, or None when
+        the location has no climate mapping
     """
-    if not user_location:
-        logger.debug("No location provided, skipping location filter")
-        return products
-    
     location = _normalize_location(user_location)
     
     if not location:
-        return products
+        return None
     
     # Shopify storefront commonly sends ISO country codes (e.g. "AR", "PK").
     location_parts = location.split("-")
@@ -167,24 +345,83 @@ def apply_location_filter(
     if not is_hot_climate and not is_cold_climate:
         # Unknown climate, don't filter
         logger.debug(f"Location '{user_location}' has no climate mapping, skipping filter")
-        return products
+        return None
     
     # Define tags to exclude based on climate
     if is_hot_climate:
-        exclude_tags = WINTER_TAGS
+        exclude_group = "winter"
         climate_type = "hot"
     else:
-        exclude_tags = SUMMER_TAGS
+        exclude_group = "summer"
         climate_type = "cold"
     
     logger.debug(f"Applying {climate_type} climate filter for {user_location}")
     
+    return exclude_group
+
+
+def _location_predicate(
+    user_location: Optional[str]
+) -> Optional[Tuple[str, Callable[[Dict[str, Any]], bool]]]:
+    """
+    Predicate keeping climate-appropriate products (None: no filtering).
+    
+    Returned with the keyword group it excludes, so callers holding
+    filter columns can use the group's column instead.
+    """
+    if not user_location:
+        return None
+    exclude_group = _climate_exclude_group(user_location)
+    if exclude_group is None:
+        return None
+    is_excluded = _tag_group_matcher(exclude_group)
+    return exclude_group, lambda product: not is_excluded(product)
+
+
+def apply_location_filter(
+    products: List[Dict[str, Any]],
+    user_location: Optional[str]
+) -> List[Dict[str, Any]]:
+    """
+    Filter products based on user's location/climate.
+    
+    For users in hot climates (Pakistan, India, UAE, etc.):
+    - Excludes winter items (wool coats, snow boots, etc.)
+    
+    For users in cold climates (Canada, UK, Russia, etc.):
+    - Excludes summer-only items (swimwear, beach items, etc.)
+    
+    Args:
+        products: List of product dictionaries to filter
+        user_location: User's country/region (e.g., "Pakistan", "Canada")
+        
+    Returns:
+        Filtered list of products appropriate for the climate
+        
+    Example:
+        >>> products = [
+        ...     {"id": "1", "title": "Wool Winter Coat", "tags": ["winter", "coat"]},
+        ...     {"id": "2", "title": "Organic Moisturizer", "tags": ["skincare"]},
+        ... ]
+        >>> filtered = apply_location_filter(products, "Pakistan")
+        >>> len(filtered)  # Only moisturizer, wool coat filtered out
+        1
+    """
+    if not user_location:
+        logger.debug("No location provided, skipping location filter")
+        return products
+    
+    exclude_group = _climate_exclude_group(user_location)
+    if exclude_group is None:
+        return products
+    
     # Filter products
     filtered = []
     excluded_count = 0
+    is_excluded = _tag_group_matcher(exclude_group)
     
     for product in products:
-        if _has_any_tag(product, exclude_tags):
+        if is_excluded(product):
             excluded_count += 1
             logger.debug(f"Excluded product '{product.get('id')}' - climate mismatch")
         else:
@@ -210,9 +447,10 @@ def apply_vegan_filter(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         Products with vegan/cruelty-free tags only
     """
     filtered = []
+    is_vegan = _tag_group_matcher("vegan")
     
     for product in products:
-        if _has_any_tag(product, VEGAN_TAGS):
+        if is_vegan(product):
             filtered.append(product)
     
     logger.info(f"Vegan filter: {len(filtered)}/{len(products)} products passed")
@@ -233,9 +471,10 @@ def apply_sustainable_filter(products: List[Dict[str, Any]]) -> List[Dict[str, A
         Products with sustainability tags only
     """
     filtered = []
+    is_sustainable = _tag_group_matcher("sustainable")
     
     for product in products:
-        if _has_any_tag(product, SUSTAINABLE_TAGS):
+        if is_sustainable(product):
             filtered.append(product)
     
     logger.info(f"Sustainable filter: {len(filtered)}/{len(products)} products passed")
@@ -244,7 +483,8 @@ def apply_sustainable_filter(products: List[Dict[str, Any]]) -> List[Dict[str, A
 
 def apply_price_filter(
     products: List[Dict[str, Any]],
-    price_range: Optional[str]
+    price_range: Optional[str],
+    prices: Optional[np.ndarray] = None
 ) -> List[Dict[str, Any]]:
     """
     Filter products by price range.
@@ -257,6 +497,8 @@ def apply_price_filter(
     Args:
         products: List of product dictionaries with 'price' field
         price_range: One of "low", "medium", "high"
+        prices: Optional float price per product (NaN where unparsed),
+            aligned with ``products``, to compare in one vectorized pass
         
     Returns:
         Products within the specified price range
@@ -268,31 +510,108 @@ def apply_price_filter(
     min_price = range_config["min"]
     max_price = range_config["max"]
     
-    filtered = []
-    
-    for product in products:
-        try:
-            # Parse price - handle string format
-            price_str = str(product.get("price", "0"))
-            # Remove currency symbols and whitespace
-            price_str = price_str.replace("$", "").replace(",", "").strip()
-            price = float(price_str)
-            
-            if min_price <= price <= max_price:
-                filtered.append(product)
-                
-        except (ValueError, TypeError) as e:
-            # If price can't be parsed, include the product
-            logger.debug(f"Could not parse price for product {product.get('id')}: {e}")
-            filtered.append(product)
+    if prices is not None:
+        in_range = _price_range_mask(products, prices, min_price, max_price)
+        filtered = [products[i] for i in np.flatnonzero(in_range)]
+    else:
+        filtered = [
+            product for product in products
+            if _price_in_range(product, min_price, max_price)
+        ]
     
     logger.info(f"Price filter ({price_range}): {len(filtered)}/{len(products)} products passed")
     return filtered
 
 
-def apply_ethical_filters(
+def _price_in_range(product: Dict[str, Any], min_price: float, max_price: float) -> bool:
+    """Check a product's price against a range (unparseable prices pass)."""
+    try:
+        # Parse price - handle string format
+        price_str = str(product.get("price", "0"))
+        # Remove currency symbols and whitespace
+        price_str = price_str.replace("$", "").replace(",", "").strip()
+        price = float(price_str)
+        
+        return min_price <= price <= max_price
+        
+    except (ValueError, TypeError) as e:
+        # If price can't be parsed, include the product
+        logger.debug(f"Could not parse price for product {product.get('id')}: {e}")
+        return True
+
+
+def _parse_plain_price(product: Dict[str, Any]) -> float:
+    """Product price as a float, or NaN if it is not a plain number."""
+    try:
+        return float(product.get("price", 0))
+    except (ValueError, TypeError):
+        return float("nan")
+
+
+def _price_range_mask(
     products: List[Dict[str, Any]],
+    prices: np.ndarray,
+    min_price: float,
+    max_price: float,
+    rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Vectorized _price_in_range() over pre-parsed prices.
+    
+    Rows whose price could not be parsed up front (NaN) are checked
+    individually, so currency-formatted strings behave as before.
+    ``prices[i]`` belongs to ``products[rows[i]]`` when rows is given.
+    """
+    in_range = (prices >= min_price) & (prices <= max_price)
+    for i in np.flatnonzero(np.isnan(prices)):
+        product = products[i if rows is None else rows[i]]
+        in_range[i] = _price_in_range(product, min_price, max_price)
+    return in_range
+
+
+def _preferred_price_range(
     user_preferences: Optional[Dict[str, Any]]
+) -> Optional[Tuple[float, float]]:
+    """(min, max) of the requested price tier, if any."""
+    price_range = (user_preferences or {}).get("price_range")
+    if price_range and price_range in PRICE_RANGES:
+        return PRICE_RANGES[price_range]["min"], PRICE_RANGES[price_range]["max"]
+    return None
+
+
+def _ethical_predicates(
+    user_preferences: Optional[Dict[str, Any]]
+) -> List[Tuple[str, Callable[[Dict[str, Any]], bool]]]:
+    """
+    Per-product predicates equivalent to apply_ethical_filters().
+    
+    Each is paired with the filter column it corresponds to (a keyword
+    group, or "price"; see build_filter_columns).
+    """
+    predicates: List[Tuple[str, Callable[[Dict[str, Any]], bool]]] = []
+    if not user_preferences:
+        return predicates
+    
+    if user_preferences.get("vegan"):
+        predicates.append(("vegan", _tag_group_matcher("vegan")))
+    
+    if user_preferences.get("sustainable"):
+        predicates.append(("sustainable", _tag_group_matcher("sustainable")))
+    
+    bounds = _preferred_price_range(user_preferences)
+    if bounds is not None:
+        min_price, max_price = bounds
+        predicates.append(
+            ("price", lambda product: _price_in_range(product, min_price, max_price))
+        )
+    
+    return predicates
+
+
+def apply_ethical_filters(
+    products: List[Dict[str, Any]],
+    user_preferences: Optional[Dict[str, Any]],
+    prices: Optional[np.ndarray] = None
 ) -> List[Dict[str, Any]]:
     """
     Apply all ethical and preference-based filters.
@@ -308,6 +627,8 @@ def apply_ethical_filters(
             - vegan (bool): Filter for vegan products
             - sustainable (bool): Filter for sustainable products
             - price_range (str): "low", "medium", or "high"
+        prices: Optional pre-parsed prices aligned with ``products``
+            (see apply_price_filter)
             
     Returns:
         Products matching all specified preferences
@@ -320,6 +641,12 @@ def apply_ethical_filters(
         return products
     
     filtered = products
+    price_range = user_preferences.get("price_range")
+    
+    # Pre-parsed prices are aligned with the input, so the (vectorized)
+    # price filter goes first while positions still line up
+    if prices is not None and price_range:
+        filtered = apply_price_filter(filtered, price_range, prices)
     
     # Apply vegan filter if requested
     if user_preferences.get("vegan"):
@@ -330,8 +657,7 @@ def apply_ethical_filters(
         filtered = apply_sustainable_filter(filtered)
     
     # Apply price range filter
-    price_range = user_preferences.get("price_range")
-    if price_range:
+    if prices is None and price_range:
         filtered = apply_price_filter(filtered, price_range)
     
     return filtered
@@ -364,7 +690,7 @@ def apply_category_filter(
     if not target_category:
         return products
     
-    target = target_category.lower().strip()
+    target = _normalize_category(target_category)
     
     # Define complementary categories (for future enhancement)
     # Currently keeping same-category only for precision
@@ -378,7 +704,7 @@ def apply_category_filter(
     filtered = []
     
     for product in products:
-        product_category = str(product.get("category", "")).lower().strip()
+        product_category = _normalize_category(str(product.get("category", "")))
         if product_category in allowed_categories:
             filtered.append(product)
     
@@ -391,8 +717,11 @@ def apply_all_filters(
     user_location: Optional[str] = None,
     user_preferences: Optional[Dict[str, Any]] = None,
     target_category: Optional[str] = None,
-    merchant_settings: Optional[Dict[str, Any]] = None
-) -> List[Dict[str, Any]]:
+    merchant_settings: Optional[Dict[str, Any]] = None,
+    return_indices: bool = False,
+    columns: Optional[Dict[str, np.ndarray]] = None,
+    rows: Optional[np.ndarray] = None
+) -> Union[List[Dict[str, Any]], np.ndarray]:
     """
     Apply all filters in the correct order, respecting merchant settings.
     
@@ -401,24 +730,57 @@ def apply_all_filters(
     2. Location filter (climate-appropriate) — controlled by locationFilter.enabled
     3. Ethical filters (vegan, sustainable, price) — controlled by ethicalFilter.enabled
     
+    Filters backed by one of ``columns`` are evaluated as vectorized masks;
+    the rest run as per-product predicates in a single pass over the rows
+    that survive the masks, so survivors are collected once. With ``rows``,
+    a caller holding a whole catalog (and its columns) filters a subset of
+    it by position, without building a list of the candidate dicts.
+    
     Args:
         products: List of product dictionaries
         user_location: User's country/region for climate filtering
         user_preferences: Dict with vegan, sustainable, price_range
         target_category: Category to match
         merchant_settings: Dict with filter toggles from merchant settings
+        return_indices: Return positions into ``products`` instead of dicts
+        columns: Optional filter columns aligned with ``products`` (see
+            build_filter_columns)
+        rows: Optional positions into ``products`` (and ``columns``) to
+            filter; the other products are not considered
         
     Returns:
-        Products passing all applicable filters
+        Products passing all applicable filters, or (with return_indices)
+        an int32 array of their positions in ``products``, in order
     """
-    logger.info(f"Applying filters to {len(products)} products")
+    num_candidates = len(products) if rows is None else len(rows)
+    logger.info(f"Applying filters to {num_candidates} products")
     
     # Extract filter settings (default to all enabled for backwards compat)
     filters_config = {}
     if merchant_settings and isinstance(merchant_settings, dict):
         filters_config = merchant_settings.get("filters", {})
     
-    filtered = products
+    columns = columns or {}
+    
+    def column_values(name: str) -> Optional[np.ndarray]:
+        """Filter column ``name`` aligned with the candidates, if there is one."""
+        column = columns.get(name)
+        if column is None or rows is None:
+            return column
+        return column[rows]
+    
+    # One entry per enabled filter, for trace and per-stage count logging.
+    # Stages with a filter column become masks; the rest stay predicates.
+    stages: List[FilterStage] = []
+    masks: List[np.ndarray] = []
+    predicates: List[Callable[[Dict[str, Any]], bool]] = []
+    
+    def add_stage(stage, predicate, mask=None):
+        stages.append((stage, predicate, mask))
+        if mask is not None:
+            masks.append(mask)
+        else:
+            predicates.append(predicate)
     
     # 1. Category filter — controlled by sameCategoryOnly
     same_category = True  # default
@@ -426,11 +788,13 @@ def apply_all_filters(
         same_category = filters_config.get("sameCategoryOnly", True)
     
     if target_category and same_category:
-        filtered = apply_category_filter(filtered, target_category)
-        logger.debug(f"After category filter: {len(filtered)} products")
-        if any(str(p.get("id")) == "8143046279257" for p in products) and \
-           not any(str(p.get("id")) == "8143046279257" for p in filtered):
-            logger.info(f"DEBUG: Missing Product DROPPED by Category Filter (Target: {target_category})")
+        target = _normalize_category(target_category)
+        category_column = column_values("category")
+        add_stage(
+            f"Category Filter (Target: {target_category})",
+            lambda product: _normalize_category(str(product.get("category", ""))) == target,
+            None if category_column is None else category_column == target,
+        )
     
     # 2. Location filter — controlled by locationFilter.enabled
     location_enabled = True  # default
@@ -442,11 +806,15 @@ def apply_all_filters(
             location_enabled = loc_cfg
     
     if user_location and location_enabled:
-        filtered = apply_location_filter(filtered, user_location)
-        logger.debug(f"After location filter: {len(filtered)} products")
-        if any(str(p.get("id")) == "8143046279257" for p in products) and \
-           not any(str(p.get("id")) == "8143046279257" for p in filtered):
-            logger.info(f"DEBUG: Missing Product DROPPED by Location Filter (UserLoc: {user_location})")
+        location = _location_predicate(user_location)
+        if location is not None:
+            exclude_group, location_ok = location
+            excluded = column_values(exclude_group)
+            add_stage(
+                f"Location Filter (UserLoc: {user_location})",
+                location_ok,
+                None if excluded is None else ~excluded,
+            )
     
     # 3. Ethical/preference filters — controlled by ethicalFilter.enabled
     ethical_enabled = False  # default OFF
@@ -465,19 +833,44 @@ def apply_all_filters(
         elif isinstance(eth_cfg, bool):
             ethical_enabled = eth_cfg
     
-    if user_preferences and ethical_enabled:
-        filtered = apply_ethical_filters(filtered, user_preferences)
-        logger.debug(f"After ethical filters: {len(filtered)} products")
-        if any(str(p.get("id")) == "8143046279257" for p in products) and \
-           not any(str(p.get("id")) == "8143046279257" for p in filtered):
-            logger.info("DEBUG: Missing Product DROPPED by Ethical/Price Filters")
-
-    elif user_preferences and not filters_config:
-        # Backwards compat: if no merchant_settings, apply as before
-        filtered = apply_ethical_filters(filtered, user_preferences)
-        logger.debug(f"After ethical filters (legacy): {len(filtered)} products")
+    # Backwards compat: without merchant_settings, preferences apply as before
+    if user_preferences and (ethical_enabled or not filters_config):
+        for column, ethical_ok in _ethical_predicates(user_preferences):
+            mask = column_values(column)
+            if column == "price" and mask is not None:
+                mask = _price_range_mask(
+                    products, mask, *_preferred_price_range(user_preferences), rows=rows
+                )
+            add_stage("Ethical/Price Filters", ethical_ok, mask)
+    
+    _log_trace_drop(products, rows, stages)
+    _log_stage_counts(products, rows, stages)
+    
+    # Positions into products of the rows still in play (None: all of them)
+    candidates: Optional[np.ndarray] = rows
+    if masks:
+        passed = np.flatnonzero(np.logical_and.reduce(masks))
+        candidates = passed if rows is None else rows[passed]
+    
+    if return_indices:
+        if candidates is None:
+            candidates = np.arange(len(products), dtype=np.int32)
+        if predicates:
+            candidates = np.fromiter(
+                (i for i in candidates if all(ok(products[i]) for ok in predicates)),
+                dtype=np.int32,
+            )
+        kept = candidates.astype(np.int32, copy=False)
+        logger.info(f"Filters complete: {len(kept)}/{num_candidates} products passed")
+        return kept
+    
+    filtered = products
+    if candidates is not None:
+        filtered = [products[i] for i in candidates]
+    if predicates:
+        filtered = [p for p in filtered if all(ok(p) for ok in predicates)]
     
-    logger.info(f"Filters complete: {len(filtered)}/{len(products)} products passed")
+    logger.info(f"Filters complete: {len(filtered)}/{num_candidates} products passed")
     
     return filtered
 
@@ -506,4 +899,4 @@ def exclude_products(
     
     exclude_set = set(str(id) for id in exclude_ids)
     
-    return [p for p in products if str(p.get("id")) not in exclude_set]
+    return [p for p in products if _product_id(p) not in exclude_set]
@@ -18,10 +18,16 @@ The key insight: Shopify merchants have different product IDs than Amazon,
 so we use category-based mapping to bridge the gap.
 """
 
+import json
 import logging
-from typing import Dict, List, Optional, Tuple, Any
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
 import numpy as np
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 from config import (
     CATEGORY_KEYWORDS,
@@ -36,13 +42,200 @@ from config import (
     TAG_BOOST_WEIGHT,
     PRICE_PROXIMITY_WEIGHT,
     PRICE_PROXIMITY_RANGE,
+    INDEXING_WORKERS,
+    PARALLEL_INDEXING_MIN_PRODUCTS,
+    FAISS_SEARCH_MIN_CANDIDATES,
+    FAISS_SEARCH_OVERSAMPLE,
+    FAISS_IVF_MIN_PRODUCTS,
+    FAISS_IVF_NPROBE,
+    FAISS_SCALAR_QUANTIZER,
+    DEBUG_TRACE_PRODUCT_ID,
+    POPULAR_CACHE_TTL_SECONDS,
+    POPULAR_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_MAX_ENTRIES,
 )
 from src.model_loader import get_model_loader
-from src.filters import apply_all_filters, exclude_products
+from src.filters import (
+    apply_all_filters,
+    build_filter_columns,
+    normalize_product_tags,
+    normalize_tag_list,
+    precompute_match_fields,
+)
 from src.category_classifier import get_category_classifier
+from src.scoring_kernel import score_candidates, top_k_indices
 
 logger = logging.getLogger(__name__)
 
+# Optional Aho-Corasick automaton for keyword category scoring
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - depends on the environment
+    ahocorasick = None
+
+_keyword_automaton = None
+
+
+@lru_cache(maxsize=None)
+def _keyword_table() -> Tuple[Tuple[str, Tuple[Tuple[str, int], ...]], ...]:
+    """
+    CATEGORY_KEYWORDS as (category, ((lowercased keyword, score), ...)).
+
+    A keyword scores its word count. Computed once so the scoring loops
+    don't lowercase and split every keyword for every product.
+    """
+    return tuple(
+        (
+            category,
+            tuple((keyword.lower(), len(keyword.split())) for keyword in keywords),
+        )
+        for category, keywords in CATEGORY_KEYWORDS.items()
+    )
+
+
+def _get_keyword_automaton():
+    """
+    Build (once) an automaton over all CATEGORY_KEYWORDS.
+
+    Each keyword maps to its (category, score) entries, one per listing, so
+    a keyword listed under several categories scores for each of them.
+    Returns None when pyahocorasick is not installed.
+    """
+    global _keyword_automaton
+    if _keyword_automaton is None and ahocorasick is not None:
+        entries: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        for category, keywords in _keyword_table():
+            for keyword, score in keywords:
+                if keyword:
+                    entries[keyword].append((category, score))
+        automaton = ahocorasick.Automaton()
+        for keyword, value in entries.items():
+            automaton.add_word(keyword, (keyword, value))
+        automaton.make_automaton()
+        _keyword_automaton = automaton
+    return _keyword_automaton
+
+
+def _normalize_category_fields(product: Dict[str, Any]) -> Tuple[str, str, Tuple[str, ...]]:
+    """Lowercased (title, product_type, tags) used as the detection cache key."""
+    tags = product.get("tags", [])
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(",")]
+    return (
+        str(product.get("title", "")).lower(),
+        str(product.get("product_type", "")).lower(),
+        tuple(str(t).lower() for t in tags),
+    )
+
+
+def _keyword_category(title: str, product_type: str, tags: Tuple[str, ...]) -> str:
+    """
+    Score each category by matching CATEGORY_KEYWORDS in title + type + tags.
+
+    Expects the lowercased fields from _normalize_category_fields().
+    """
+    combined_text = f"{title} {product_type} {' '.join(tags)}"
+
+    # Score each category: every keyword present (as a substring) adds its
+    # word count once
+    category_scores: Dict[str, int] = dict.fromkeys(CATEGORY_KEYWORDS, 0)
+
+    automaton = _get_keyword_automaton()
+    if automaton is not None:
+        # One pass over the text finds every keyword occurrence
+        matched = {}
+        for _, (keyword, entries) in automaton.iter(combined_text):
+            matched[keyword] = entries
+        for entries in matched.values():
+            for category, score in entries:
+                category_scores[category] += score
+    else:
+        for category, keywords in _keyword_table():
+            category_scores[category] = sum(
+                score for keyword, score in keywords if keyword in combined_text
+            )
+
+    # Return category with highest score
+    if not category_scores or max(category_scores.values()) == 0:
+        for category in CATEGORY_KEYWORDS.keys():
+            if category in product_type:
+                return category
+        return "home"  # Fallback default
+
+    best_category = max(category_scores.items(), key=lambda x: x[1])
+    return best_category[0]
+
+
+@lru_cache(maxsize=16384)
+def _classify_category(
+    title: str,
+    product_type: str,
+    tags: Tuple[str, ...]
+) -> Tuple[str, float, str]:
+    """
+    Cached ML + keyword category detection on normalized product fields.
+
+    Detection is a pure function of these fields, so product variants that
+    share a title/type/tags are only classified once. Errors from the ML
+    classifier propagate (and are therefore not cached).
+    """
+    classifier = get_category_classifier()
+    ml_category, ml_confidence = classifier.predict(title, product_type, list(tags))
+
+    if ml_confidence >= 0.6:
+        logger.debug(
+            "ML classified '%s' → %s (%.2f)",
+            title, ml_category, ml_confidence,
+        )
+        return ml_category, ml_confidence, "ml"
+
+    # Medium confidence — cross-check with keywords
+    kw_category = _keyword_category(title, product_type, tags)
+    if kw_category == ml_category:
+        return ml_category, ml_confidence, "ml+keywords"
+
+    # Disagree — trust keywords for now
+    logger.debug(
+        "ML (%.2f %s) vs keywords (%s) — using keywords for '%s'",
+        ml_confidence, ml_category, kw_category, title,
+    )
+    return kw_category, 0.5, "keywords"
+
+
+class MerchantIndex(NamedTuple):
+    """
+    Positional arrays for one merchant's products, built by reindexing.
+
+    Row i of every per-product field refers to the same product. Never
+    mutated after it is built: reindexing replaces the whole snapshot.
+    """
+    # Bumped on every (re)index, see ProductRecommender._merchant_version
+    version: int
+    # [product_ids]
+    product_ids: List[str]
+    # [product_data]
+    products: List[Dict[str, Any]]
+    # {product_id: row}
+    positions: Dict[str, int]
+    # float32 array (N, D) of L2-normalized vectors
+    matrix: np.ndarray
+    # bool array (N,), True if row has an embedding
+    has_vector: np.ndarray
+    # {category: int32 array of rows}
+    category_rows: Dict[str, np.ndarray]
+    # uint64 array (N, ceil(V/64)) of tag bitmaps over the merchant's tag vocabulary
+    tag_bits: np.ndarray
+    # int32 array (N,) of distinct tags per product
+    tag_counts: np.ndarray
+    # [response_dict_without_score_and_reason]
+    response_templates: List[Dict[str, Any]]
+    # {column: array (N,)} with the normalized category, price and
+    # keyword-group flags the filters read (see filters.build_filter_columns)
+    filter_columns: Dict[str, np.ndarray]
+    # faiss.IndexFlatIP (or IndexIVFFlat past FAISS_IVF_MIN_PRODUCTS) over
+    # matrix, only for merchants with >= FAISS_SEARCH_MIN_CANDIDATES products
+    faiss_index: Optional[Any]
+
 
 class ProductRecommender:
     """
@@ -78,18 +271,39 @@ class ProductRecommender:
         # Merchant product storage
         # Structure: {merchant_id: {product_id: product_data_with_mapping}}
         self._merchant_products: Dict[str, Dict[str, Dict]] = {}
-        
-        # Category to products index for fast lookup
-        # Structure: {merchant_id: {category: [product_ids]}}
-        self._category_index: Dict[str, Dict[str, List[str]]] = {}
-        
-        # Model loader reference
-        self._model_loader = None
+
+        # Model loader reference, pinned once (initialization is lazy and
+        # idempotent; get_instance() warms it eagerly for the singleton)
+        self._model_loader = get_model_loader()
         
         # Category representatives cache
         # Structure: {category: [amazon_product_ids]}  
         self._category_representatives: Dict[str, List[str]] = {}
-        
+
+        # Amazon embedding cache (FAISS reconstruct results), in LRU order
+        # and capped at EMBEDDING_CACHE_MAX_ENTRIES
+        # Structure: {amazon_product_id: embedding}
+        self._embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._embedding_lock = threading.Lock()
+
+        # Positional product arrays used for vectorized scoring, one immutable
+        # snapshot per merchant (see MerchantIndex). Reindexing publishes a
+        # new snapshot with a single assignment and requests read it once,
+        # so a request never mixes arrays from two registrations.
+        # Structure: {merchant_id: MerchantIndex}
+        self._merchant_indexes: Dict[str, MerchantIndex] = {}
+
+        # Bumped whenever a merchant's product snapshot is (re)indexed or
+        # cleared, so cached responses for an old snapshot are never served
+        # Structure: {merchant_id: version}
+        self._merchant_version: Dict[str, int] = {}
+        # Rows (into that version's MerchantIndex) rather than response dicts,
+        # so every hit returns freshly built dicts the caller can mutate
+        # Structure: {(merchant_id, version, request args...): (expires_at, rows)}
+        self._popular_cache: Dict[Tuple, Tuple[float, np.ndarray]] = {}
+        # Guards every read, store and eviction of _popular_cache
+        self._popular_lock = threading.Lock()
+
         logger.info("ProductRecommender initialized")
     
     @classmethod
@@ -97,13 +311,12 @@ class ProductRecommender:
         """Get the singleton instance of ProductRecommender."""
         if cls._instance is None:
             cls._instance = ProductRecommender()
+            # Load model artifacts once, off the per-request path
+            cls._instance._model_loader.initialize()
         return cls._instance
     
     def _get_model_loader(self):
-        """Get the model loader instance, initializing if needed."""
-        if self._model_loader is None:
-            self._model_loader = get_model_loader()
-            self._model_loader.initialize()
+        """Get the pinned model loader instance."""
         return self._model_loader
     
     def _detect_category(self, product: Dict[str, Any]) -> Tuple[str, float, str]:
@@ -124,41 +337,16 @@ class ProductRecommender:
             - confidence: 0.0-1.0 score
             - method: "ml" or "keywords"
         """
-        title = str(product.get("title", ""))
-        product_type = str(product.get("product_type", ""))
-        tags = product.get("tags", [])
-        if isinstance(tags, str):
-            tags = [t.strip() for t in tags.split(",")]
+        fields = _normalize_category_fields(product)
 
-        # 1. Try ML classifier
+        # 1. Try ML classifier (cached per normalized title/type/tags)
         try:
-            classifier = get_category_classifier()
-            ml_category, ml_confidence = classifier.predict(title, product_type, tags)
-
-            if ml_confidence >= 0.6:
-                logger.debug(
-                    "ML classified '%s' → %s (%.2f)",
-                    title, ml_category, ml_confidence,
-                )
-                return ml_category, ml_confidence, "ml"
-
-            # Medium confidence — cross-check with keywords
-            kw_category = self._detect_category_keywords(product)
-            if kw_category == ml_category:
-                return ml_category, ml_confidence, "ml+keywords"
-
-            # Disagree — trust keywords for now
-            logger.debug(
-                "ML (%.2f %s) vs keywords (%s) — using keywords for '%s'",
-                ml_confidence, ml_category, kw_category, title,
-            )
-            return kw_category, 0.5, "keywords"
-
+            return _classify_category(*fields)
         except Exception as e:
             logger.warning("ML category detection failed: %s", e)
 
         # 2. Fallback to keyword matching
-        kw_category = self._detect_category_keywords(product)
+        kw_category = _keyword_category(*fields)
         return kw_category, 0.5, "keywords"
 
     def _detect_category_keywords(self, product: Dict[str, Any]) -> str:
@@ -168,35 +356,7 @@ class ProductRecommender:
         Uses CATEGORY_KEYWORDS from config to score each category
         by counting matching keywords in title + product_type + tags.
         """
-        title = str(product.get("title", "")).lower()
-        product_type = str(product.get("product_type", "")).lower()
-
-        tags = product.get("tags", [])
-        if isinstance(tags, str):
-            tags = [t.strip() for t in tags.split(",")]
-        tags_text = " ".join(str(t).lower() for t in tags)
-
-        combined_text = f"{title} {product_type} {tags_text}"
-
-        # Score each category
-        category_scores: Dict[str, int] = {}
-
-        for category, keywords in CATEGORY_KEYWORDS.items():
-            score = 0
-            for keyword in keywords:
-                if keyword.lower() in combined_text:
-                    score += len(keyword.split())
-            category_scores[category] = score
-
-        # Return category with highest score
-        if not category_scores or max(category_scores.values()) == 0:
-            for category in CATEGORY_KEYWORDS.keys():
-                if category in product_type:
-                    return category
-            return "home"  # Fallback default
-
-        best_category = max(category_scores.items(), key=lambda x: x[1])
-        return best_category[0]
+        return _keyword_category(*_normalize_category_fields(product))
     
     def _find_amazon_representatives(
         self,
@@ -280,17 +440,18 @@ class ProductRecommender:
             ... ])
             {"registered": 2, "categories": {"beauty": 1, "fashion": 1}}
         """
-        logger.info(f"Registering {len(products)} products for merchant {merchant_id}")
-        
-        # Replace merchant snapshot atomically on each registration call.
-        # This prevents stale products/categories when Node re-registers
-        # after create/update/delete webhook syncs.
-        self._merchant_products[merchant_id] = {}
-        self._category_index[merchant_id] = defaultdict(list)
-        
-        # Track category counts
-        category_counts: Dict[str, int] = defaultdict(int)
-        registered_count = 0
+        logger.info(f"Registering {len(products)} products for merchant {merchant_id}")
+        
+        # Replace merchant snapshot atomically on each registration call.
+        # This prevents stale products/categories when Node re-registers
+        # after create/update/delete webhook syncs. The new products are
+        # collected aside and published once, so concurrent requests never
+        # see a half-registered catalog.
+        merchant_products: Dict[str, Dict[str, Any]] = {}
+        
+        # Track category counts
+        category_counts: Dict[str, int] = defaultdict(int)
+        registered_count = 0
         
         for product in products:
             product_id = str(product.get("id", ""))
@@ -298,6 +459,11 @@ class ProductRecommender:
                 logger.warning("Skipping product without ID")
                 continue
             
+            # Tags are always stored as a list of stripped strings
+            # (comma-separated input is split), so neither detection nor
+            # downstream code has to branch on the format
+            product = {**product, "tags": normalize_tag_list(product.get("tags"))}
+            
             # Detect category (ML with keyword fallback)
             category, confidence, method = self._detect_category(product)
             
@@ -307,26 +473,342 @@ class ProductRecommender:
             # Store product with mapping data
             product_data = {
                 **product,
-                "category": category,
+                "_sid": product_id,  # canonical string ID
+                # Interned: every product in a category shares one string
+                "category": sys.intern(str(category)),
                 "category_confidence": round(confidence, 3),
                 "category_method": method,
                 "amazon_representatives": amazon_reps,
             }
             
-            self._merchant_products[merchant_id][product_id] = product_data
-            self._category_index[merchant_id][category].append(product_id)
-            category_counts[category] += 1
-            registered_count += 1
-        
-        result = {
-            "registered": registered_count,
-            "categories": dict(category_counts),
-            "merchant_id": merchant_id
-        }
+            merchant_products[product_id] = product_data
+            # Counted on the stored str: the classifier may return np.str_
+            category_counts[product_data["category"]] += 1
+            registered_count += 1
+
+        self._merchant_products[merchant_id] = merchant_products
+
+        # Precompute product vectors so requests only do a matrix product
+        self._index_merchant_products(merchant_id)
+
+        result = {
+            "registered": registered_count,
+            "categories": dict(category_counts),
+            "merchant_id": merchant_id
+        }
         
         logger.info(f"Registration complete: {result}")
         return result
     
+    def _build_product_vector(
+        self,
+        product: Dict[str, Any],
+        model_loader
+    ) -> Optional[np.ndarray]:
+        """
+        Build the L2-normalized vector for a Shopify product.
+
+        The vector is the mean of the product's Amazon representative
+        embeddings. Returns None if no representative has an embedding.
+
+        Embeddings are accumulated into a single float32 buffer instead of
+        stacking them for np.mean; dividing by the count is skipped because
+        the L2 normalization below yields the same direction.
+        """
+        product_vector = None
+        for rep in product.get("amazon_representatives", []):
+            embedding = self._get_embedding(model_loader, rep)
+            if embedding is None:
+                continue
+            if product_vector is None:
+                product_vector = np.array(embedding, dtype=np.float32)
+            else:
+                product_vector += embedding
+
+        if product_vector is None:
+            return None
+
+        norm = np.linalg.norm(product_vector)
+        if norm > 0:
+            product_vector /= norm
+        return product_vector
+
+    def _index_merchant_products(self, merchant_id: str) -> None:
+        """
+        Build the positional arrays for a merchant's registered products.
+
+        Stores product IDs in row order, an ID → row lookup, and the
+        (N, D) float32 matrix of normalized product vectors so scoring
+        a request is a single matrix-vector product. Everything is built
+        into one MerchantIndex, published with a single assignment.
+        """
+        products = self._merchant_products.get(merchant_id, {})
+        model_loader = self._get_model_loader()
+
+        product_ids = list(products.keys())
+        for pid in product_ids:
+            # Canonical string ID (set at registration; filled in here for
+            # products stored without going through registration)
+            products[pid].setdefault("_sid", pid)
+            # Normalized tags / match text for the filters and tag boosts
+            precompute_match_fields(products[pid])
+
+        # Representatives are chosen per category, so many products share the
+        # same list. Build one vector per distinct list and fan it out.
+        rep_keys = [
+            tuple(products[pid].get("amazon_representatives", []))
+            for pid in product_ids
+        ]
+        key_slot: Dict[Tuple[str, ...], int] = {}
+        unique_products: List[Dict[str, Any]] = []
+        for pid, key in zip(product_ids, rep_keys):
+            if key not in key_slot:
+                key_slot[key] = len(unique_products)
+                unique_products.append(products[pid])
+
+        def build(product: Dict[str, Any]) -> Optional[np.ndarray]:
+            return self._build_product_vector(product, model_loader)
+
+        if len(unique_products) >= PARALLEL_INDEXING_MIN_PRODUCTS and INDEXING_WORKERS > 1:
+            with ThreadPoolExecutor(max_workers=INDEXING_WORKERS) as executor:
+                unique_vectors = list(executor.map(build, unique_products))
+        else:
+            unique_vectors = [build(product) for product in unique_products]
+
+        dim = next(
+            (len(v) for v in unique_vectors if v is not None),
+            MODEL_CONFIG["output_dim"],
+        )
+        matrix = np.zeros((len(product_ids), dim), dtype=np.float32)
+        has_vector = np.zeros(len(product_ids), dtype=bool)
+        for row, key in enumerate(rep_keys):
+            vector = unique_vectors[key_slot[key]]
+            if vector is not None:
+                matrix[row] = vector
+                has_vector[row] = True
+
+        indexed_products = [products[pid] for pid in product_ids]
+        category_rows: Dict[Any, List[int]] = defaultdict(list)
+        for row, product in enumerate(indexed_products):
+            category_rows[product.get("category")].append(row)
+        tag_bits, tag_counts = self._build_tag_bitmaps(indexed_products)
+        faiss_index = None
+        if len(product_ids) >= FAISS_SEARCH_MIN_CANDIDATES:
+            faiss_index = self._build_faiss_index(matrix)
+
+        version = self._merchant_version.get(merchant_id, 0) + 1
+        self._merchant_version[merchant_id] = version
+        self._merchant_indexes[merchant_id] = MerchantIndex(
+            version=version,
+            product_ids=product_ids,
+            products=indexed_products,
+            positions={pid: row for row, pid in enumerate(product_ids)},
+            matrix=matrix,
+            has_vector=has_vector,
+            category_rows={
+                category: np.array(rows, dtype=np.int32)
+                for category, rows in category_rows.items()
+            },
+            tag_bits=tag_bits,
+            tag_counts=tag_counts,
+            response_templates=[
+                self._build_response_template(product) for product in indexed_products
+            ],
+            filter_columns=build_filter_columns(indexed_products),
+            faiss_index=faiss_index,
+        )
+
+        logger.debug(
+            f"Indexed {len(product_ids)} products for {merchant_id} "
+            f"({int(has_vector.sum())} with embeddings)"
+        )
+
+    @staticmethod
+    def _build_faiss_index(matrix: np.ndarray) -> Optional[Any]:
+        """
+        Build an inner-product index over a normalized product matrix.
+
+        Rows are L2-normalized, so inner product equals cosine similarity.
+        Catalogs past FAISS_IVF_MIN_PRODUCTS get an inverted-file index with
+        sqrt(N) lists; smaller ones an exact flat index. With
+        FAISS_SCALAR_QUANTIZER set, vectors are stored as fp16 or 8-bit codes
+        to cut the bytes read per search. Returns None (dense scoring is used
+        instead) if FAISS is unavailable.
+        """
+        try:
+            import faiss
+        except ImportError as e:
+            logger.warning(f"FAISS not available, using dense scoring: {e}")
+            return None
+
+        qtype = None
+        if FAISS_SCALAR_QUANTIZER:
+            qtype = {
+                "fp16": faiss.ScalarQuantizer.QT_fp16,
+                "8bit": faiss.ScalarQuantizer.QT_8bit,
+            }.get(FAISS_SCALAR_QUANTIZER)
+            if qtype is None:
+                logger.warning(
+                    f"Unknown FAISS_SCALAR_QUANTIZER '{FAISS_SCALAR_QUANTIZER}', "
+                    "storing float32 vectors"
+                )
+
+        num_products, dim = matrix.shape
+        metric = faiss.METRIC_INNER_PRODUCT
+        if num_products < FAISS_IVF_MIN_PRODUCTS:
+            if qtype is None:
+                index = faiss.IndexFlatIP(dim)
+            else:
+                index = faiss.IndexScalarQuantizer(dim, qtype, metric)
+                index.train(matrix)
+        else:
+            nlist = max(1, int(np.sqrt(num_products)))
+            quantizer = faiss.IndexFlatIP(dim)
+            if qtype is None:
+                index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+            else:
+                index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, metric)
+            index.train(matrix)
+            index.nprobe = min(FAISS_IVF_NPROBE, nlist)
+            logger.info(f"Built IVF index: {num_products} products, {nlist} lists")
+        index.add(matrix)
+        return index
+
+    @staticmethod
+    def _shortlist_candidates(
+        index: MerchantIndex,
+        rows: np.ndarray,
+        query_vector: np.ndarray,
+        k: int
+    ) -> Optional[np.ndarray]:
+        """
+        Shortlist candidates by pure similarity using the merchant's FAISS index.
+
+        Args:
+            index: Merchant index snapshot
+            rows: Row index of each candidate
+            query_vector: Query vector
+            k: Number of recommendations requested
+
+        Returns:
+            Sorted indices into ``rows`` of the top ``k * FAISS_SEARCH_OVERSAMPLE``
+            candidates plus every candidate without an embedding, or None when
+            the merchant has no index or there are too few candidates to bother
+        """
+        faiss_index = index.faiss_index
+        if faiss_index is None or len(rows) < FAISS_SEARCH_MIN_CANDIDATES:
+            return None
+
+        import faiss
+
+        fetch = min(len(rows), k * FAISS_SEARCH_OVERSAMPLE)
+        query = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        params = None
+        if len(rows) < faiss_index.ntotal:
+            # Restrict the search to candidates that passed the filters
+            selector = faiss.IDSelectorBatch(rows.astype(np.int64))
+            if isinstance(faiss_index, faiss.IndexIVF):
+                params = faiss.SearchParametersIVF(sel=selector, nprobe=faiss_index.nprobe)
+            else:
+                params = faiss.SearchParameters(sel=selector)
+        _, found = faiss_index.search(query, fetch, params=params)
+        found_rows = found[0][found[0] >= 0]
+
+        # Map matrix rows back to candidate indices (candidate rows are unique)
+        slot = np.full(faiss_index.ntotal, -1, dtype=np.int64)
+        slot[rows] = np.arange(len(rows))
+        shortlist = slot[found_rows]
+        # Candidates without embeddings are not ranked by the index but still
+        # compete on their baseline score plus boosts
+        no_vector = np.flatnonzero(~index.has_vector[rows])
+        return np.unique(np.concatenate([shortlist, no_vector]))
+
+    @staticmethod
+    def _build_response_template(product: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Response fields of a product, without the per-request score/reason.
+
+        Tags are held as a tuple so the template shares nothing mutable
+        with the stored product; _build_response() hands out a fresh list.
+        """
+        tags = product.get("tags", [])
+        return {
+            "shopify_product_id": product.get("id"),
+            "title": product.get("title", ""),
+            "category": product.get("category", ""),
+            "price": product.get("price", "0"),
+            "image": product.get("image", ""),
+            "tags": tuple(tags) if isinstance(tags, list) else tags,
+        }
+
+    @staticmethod
+    def _build_response(template: Dict[str, Any], score: float, reason: str) -> Dict[str, Any]:
+        """A recommendation dict the caller owns, built from a response template."""
+        tags = template["tags"]
+        return {
+            **template,
+            "tags": list(tags) if isinstance(tags, tuple) else tags,
+            "score": score,
+            "reason": reason,
+        }
+
+    def _build_tag_bitmaps(
+        self,
+        products: List[Dict[str, Any]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build per-product tag bitmaps over the merchant's tag vocabulary.
+
+        Bit j of row i is set when product i has vocabulary tag j, so tag
+        overlap between two products is a bitwise AND plus popcount.
+
+        Returns:
+            Tuple of (uint64 tag bitmaps (N, ceil(V/64)), int32 tag counts (N,))
+        """
+        tag_vocab: Dict[str, int] = {}
+        bit_rows: List[int] = []
+        bit_cols: List[int] = []
+        tag_counts = np.zeros(len(products), dtype=np.int32)
+
+        for row, product in enumerate(products):
+            tags = self._normalized_tag_set(product)
+            tag_counts[row] = len(tags)
+            for tag in tags:
+                bit_rows.append(row)
+                bit_cols.append(tag_vocab.setdefault(tag, len(tag_vocab)))
+
+        n_words = max(1, (len(tag_vocab) + 63) // 64)
+        tag_bits = np.zeros((len(products), n_words), dtype=np.uint64)
+        if bit_cols:
+            cols = np.array(bit_cols, dtype=np.uint64)
+            np.bitwise_or.at(
+                tag_bits,
+                (np.array(bit_rows, dtype=np.intp), (cols >> np.uint64(6)).astype(np.intp)),
+                np.uint64(1) << (cols & np.uint64(63)),
+            )
+
+        return tag_bits, tag_counts
+
+    def _merchant_index(self, merchant_id: str) -> Optional[MerchantIndex]:
+        """
+        Current index snapshot of a merchant, built on first use.
+
+        Returns None if the merchant is not registered. Callers take the
+        snapshot once per request and read every array from it.
+        """
+        index = self._merchant_indexes.get(merchant_id)
+        if index is None and merchant_id in self._merchant_products:
+            self._index_merchant_products(merchant_id)
+            index = self._merchant_indexes.get(merchant_id)
+        return index
+
+    @staticmethod
+    def _candidate_rows(index: MerchantIndex, category: Optional[str] = None) -> np.ndarray:
+        """Rows of a merchant's products, optionally restricted to a category."""
+        if not category:
+            return np.arange(len(index.product_ids), dtype=np.int32)
+        return index.category_rows.get(category, np.empty(0, dtype=np.int32))
+
     def get_merchant_products(
         self,
         merchant_id: str,
@@ -357,11 +839,38 @@ class ProductRecommender:
         merchant_id: str,
         product_id: str
     ) -> Optional[Dict[str, Any]]:
-        """Get product data for a merchant's product."""
+        """
+        Get product data for a merchant's product.
+
+        O(1): _merchant_products is already keyed by product ID and is
+        rebuilt by register_merchant_products / dropped by clear_merchant.
+        """
         if merchant_id not in self._merchant_products:
             return None
         return self._merchant_products[merchant_id].get(str(product_id))
     
+    def _get_embedding(self, model_loader, amazon_id: str) -> Optional[np.ndarray]:
+        """
+        Get an Amazon product embedding, memoized per recommender.
+
+        Hot products (e.g. a popular product page) hit the same Amazon
+        representatives on every request; caching avoids reconstructing
+        the same vectors from the FAISS index each time. The least recently
+        used entry is evicted past EMBEDDING_CACHE_MAX_ENTRIES.
+        """
+        with self._embedding_lock:
+            embedding = self._embedding_cache.get(amazon_id)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(amazon_id)
+                return embedding
+        embedding = model_loader.get_embedding(amazon_id)
+        if embedding is not None and EMBEDDING_CACHE_MAX_ENTRIES > 0:
+            with self._embedding_lock:
+                self._embedding_cache[amazon_id] = embedding
+                while len(self._embedding_cache) > EMBEDDING_CACHE_MAX_ENTRIES:
+                    self._embedding_cache.popitem(last=False)
+        return embedding
+
     def _build_weighted_query_vector(
         self,
         merchant_id: str,
@@ -441,7 +950,7 @@ class ProductRecommender:
             
             # Use top 3 representatives for current product
             for rep in amazon_reps:  # Use all representatives
-                embedding = model_loader.get_embedding(rep)
+                embedding = self._get_embedding(model_loader, rep)
                 if embedding is not None:
                     signal_embeddings["current_product"].append(embedding)
         
@@ -456,7 +965,7 @@ class ProductRecommender:
                     
                     # Use all representatives per purchased product
                     for rep in amazon_reps:  # Use all representatives
-                        embedding = model_loader.get_embedding(rep)
+                        embedding = self._get_embedding(model_loader, rep)
                         if embedding is not None:
                             signal_embeddings["purchased"].append(embedding)
         
@@ -478,7 +987,7 @@ class ProductRecommender:
                     
                     # Use all representatives for cart items
                     for rep in amazon_reps:
-                        embedding = model_loader.get_embedding(rep)
+                        embedding = self._get_embedding(model_loader, rep)
                         if embedding is not None:
                             signal_embeddings["added_to_cart"].append(embedding)
         
@@ -497,7 +1006,7 @@ class ProductRecommender:
                     
                     # Use only top 1 representative for views (less important)
                     if amazon_reps:
-                        embedding = model_loader.get_embedding(amazon_reps[0])
+                        embedding = self._get_embedding(model_loader, amazon_reps[0])
                         if embedding is not None:
                             signal_embeddings["viewed"].append(embedding)
 
@@ -519,18 +1028,22 @@ class ProductRecommender:
             logger.warning("No embeddings found for query vector")
             return None, primary_category or "home"
         
-        embeddings_array = np.array(embeddings)
+        embeddings_array = np.stack(embeddings)
         weights_array = np.array(weights, dtype=float)
         if not np.any(weights_array):
             weights_array = np.ones_like(weights_array)
         
-        # Weighted average
-        query_vector = np.average(embeddings_array, axis=0, weights=weights_array)
+        # Weighted sum as one fused multiply-reduce. Dividing by the weight
+        # total (the weighted average) is skipped: normalization below
+        # cancels any positive scale.
+        query_vector = np.einsum("i,ij->j", weights_array, embeddings_array)
         
-        # Normalize for cosine similarity
+        # Normalize for cosine similarity. Product rows are normalized float32
+        # at registration, so scoring is a plain float32 dot product.
         norm = np.linalg.norm(query_vector)
         if norm > 0:
             query_vector = query_vector / norm
+        query_vector = np.ascontiguousarray(query_vector, dtype=np.float32)
         
         logger.debug(f"Built query vector from {len(embeddings)} embeddings")
         logger.debug(
@@ -546,6 +1059,47 @@ class ProductRecommender:
         
         return query_vector, primary_category or "home"
     
+    @staticmethod
+    def _normalized_tag_set(product: Dict[str, Any]) -> FrozenSet[str]:
+        """Lowercased, stripped set of a product's tags used for tag-boost."""
+        return normalize_product_tags(product)
+
+    @staticmethod
+    def _compute_tag_boost_vector(
+        index: MerchantIndex,
+        current_product_id: str,
+        rows: np.ndarray,
+        weight: float = TAG_BOOST_WEIGHT
+    ) -> np.ndarray:
+        """
+        Vectorized tag-boost of every candidate row against the current product.
+
+        Same Jaccard score as _compute_tag_boost, computed with a bitwise AND
+        and popcount over the merchant's precomputed tag bitmaps.
+
+        Returns:
+            Float32 array (len(rows),) of values between 0.0 and weight
+        """
+        cur_row = index.positions.get(str(current_product_id))
+        if cur_row is None or len(rows) == 0:
+            return np.zeros(len(rows), dtype=np.float32)
+
+        tag_bits = index.tag_bits
+        tag_counts = index.tag_counts
+
+        cur_count = tag_counts[cur_row]
+        if cur_count == 0:
+            return np.zeros(len(rows), dtype=np.float32)
+
+        shared = np.bitwise_count(tag_bits[rows] & tag_bits[cur_row]).sum(axis=1, dtype=np.int32)
+        cand_counts = tag_counts[rows]
+        union = cand_counts + cur_count - shared
+
+        jaccard = np.zeros(len(rows), dtype=np.float32)
+        has_tags = cand_counts > 0
+        jaccard[has_tags] = shared[has_tags] / union[has_tags]
+        return weight * jaccard
+
     def _compute_tag_boost(
         self,
         current_product: Dict[str, Any],
@@ -560,17 +1114,9 @@ class ProductRecommender:
         Returns:
             Float between 0.0 and TAG_BOOST_WEIGHT (0.15)
         """
-        current_tags = set(
-            str(t).lower().strip()
-            for t in current_product.get("tags", [])
-            if t
-        )
-        candidate_tags = set(
-            str(t).lower().strip()
-            for t in candidate_product.get("tags", [])
-            if t
-        )
-        
+        current_tags = self._normalized_tag_set(current_product)
+        candidate_tags = self._normalized_tag_set(candidate_product)
+
         if not current_tags or not candidate_tags:
             return 0.0
         
@@ -618,6 +1164,34 @@ class ProductRecommender:
         # Linear scale: closer = higher bonus
         proximity_ratio = 1.0 - (price_diff / allowed_range)
         return PRICE_PROXIMITY_WEIGHT * proximity_ratio
+
+    @staticmethod
+    def _compute_price_proximity_vector(
+        current_product: Dict[str, Any],
+        candidate_prices: np.ndarray
+    ) -> np.ndarray:
+        """
+        Vectorized _compute_price_proximity() over pre-parsed prices.
+
+        Candidates whose price is not a plain number (NaN) get 0 bonus.
+
+        Returns:
+            float32 array of bonuses between 0.0 and PRICE_PROXIMITY_WEIGHT
+        """
+        boosts = np.zeros(len(candidate_prices), dtype=np.float32)
+        try:
+            current_price = float(current_product.get("price", 0))
+        except (ValueError, TypeError):
+            return boosts
+
+        if current_price <= 0:
+            return boosts
+
+        price_diff = np.abs(current_price - candidate_prices)
+        allowed_range = current_price * PRICE_PROXIMITY_RANGE  # 30%
+        within = price_diff <= allowed_range
+        boosts[within] = PRICE_PROXIMITY_WEIGHT * (1.0 - price_diff[within] / allowed_range)
+        return boosts
     
     def get_recommendations(
         self,
@@ -672,8 +1246,10 @@ class ProductRecommender:
         same_category_only = ms_filters.get("sameCategoryOnly", True)
 
         
-        # Check if merchant is registered
-        if merchant_id not in self._merchant_products:
+        # Check if merchant is registered. Every array below is read from
+        # this one snapshot, even if the merchant is re-registered meanwhile.
+        index = self._merchant_index(merchant_id)
+        if index is None:
             logger.warning(f"Merchant {merchant_id} not registered")
             return []
         
@@ -707,22 +1283,19 @@ class ProductRecommender:
             # ensuring we don't miss matching products from other categories
             search_category = target_category if same_category_only else None
             
-            candidate_products = self.get_merchant_products(
-                merchant_id=merchant_id,
-                category=search_category
-            )
-            if len(candidate_products) < k + 1 and same_category_only:
+            candidate_rows = self._candidate_rows(index, search_category)
+            if len(candidate_rows) < k + 1 and same_category_only:
                 logger.debug(
-                    f"Category '{target_category}' has only {len(candidate_products)} candidates; "
+                    f"Category '{target_category}' has only {len(candidate_rows)} candidates; "
                     "keeping strict same-category filtering."
                 )
         else:
             # Homepage: global search across all categories
             logger.info("Homepage request — searching all products globally")
-            candidate_products = self.get_merchant_products(merchant_id)
+            candidate_rows = self._candidate_rows(index)
             target_category = None  # Don't filter by category in apply_all_filters
         
-        logger.debug(f"Found {len(candidate_products)} candidates for search")
+        logger.debug(f"Found {len(candidate_rows)} candidates for search")
         
         # Exclusions
         to_exclude = []
@@ -736,24 +1309,43 @@ class ProductRecommender:
         if exclude_purchased and user_history and user_history.get("purchased"):
             to_exclude.extend(user_history["purchased"])
             
+        positions = index.positions
         if to_exclude:
-            candidate_products = exclude_products(candidate_products, to_exclude)
-        
-        # Apply filters (respecting merchant settings)
-        filtered_products = apply_all_filters(
-            products=candidate_products,
+            excluded_rows = [
+                positions[pid] for pid in map(str, to_exclude) if pid in positions
+            ]
+            if excluded_rows:
+                # Row bitmap over the merchant's products: one gather drops
+                # every excluded candidate without a per-candidate search
+                excluded = np.zeros(len(positions), dtype=bool)
+                excluded[excluded_rows] = True
+                candidate_rows = candidate_rows[~excluded[candidate_rows]]
+        product_list = index.products
+        
+        # Apply filters (respecting merchant settings). Survivors are kept as
+        # rows of the merchant's product matrix; dicts are only dereferenced
+        # by predicate-only filters and for the final top-k.
+        rows = apply_all_filters(
+            products=product_list,
             user_location=user_location,
             user_preferences=user_preferences,
             target_category=target_category,
-            merchant_settings=merchant_settings
+            merchant_settings=merchant_settings,
+            return_indices=True,
+            columns=index.filter_columns,
+            rows=candidate_rows,
         )
         
-        if not filtered_products:
+        if not len(rows):
             logger.warning("No products passed filters")
             return []
         
         # Get current product data for tag/price boosting
-        current_product = self._get_product_data(merchant_id, current_product_id) if current_product_id else None
+        current_product = None
+        if current_product_id:
+            current_row = positions.get(str(current_product_id))
+            if current_row is not None:
+                current_product = product_list[current_row]
         
         # Extract merchant filter settings for dynamic control
         # Determine if price proximity filter is enabled
@@ -770,21 +1362,16 @@ class ProductRecommender:
                     min_price = current_price * (1 - price_prox_range)
                     max_price = current_price * (1 + price_prox_range)
                     
-                    price_filtered = []
-                    for p in filtered_products:
-                        try:
-                            p_price = float(p.get("price", 0))
-                            if min_price <= p_price <= max_price:
-                                price_filtered.append(p)
-                        except (ValueError, TypeError):
-                            price_filtered.append(p)
+                    # Unparseable prices (NaN) are kept
+                    prices = index.filter_columns["price"][rows]
+                    in_range = np.isnan(prices) | ((prices >= min_price) & (prices <= max_price))
                     
-                    if price_filtered:
+                    if in_range.any():
                         logger.info(
-                            f"Price filter: {len(price_filtered)}/{len(filtered_products)} "
+                            f"Price filter: {int(in_range.sum())}/{len(rows)} "
                             f"products within ${min_price:.2f}-${max_price:.2f}"
                         )
-                        filtered_products = price_filtered
+                        rows = rows[in_range]
                     else:
                         logger.info("Price filter removed all products, keeping original list")
             except (ValueError, TypeError):
@@ -795,120 +1382,112 @@ class ProductRecommender:
         tag_boost_enabled = tag_boost_cfg.get("enabled", True) if isinstance(tag_boost_cfg, dict) else bool(tag_boost_cfg)
         tag_boost_weight = float(tag_boost_cfg.get("weight", TAG_BOOST_WEIGHT)) if isinstance(tag_boost_cfg, dict) else TAG_BOOST_WEIGHT
         
-        # Score products using FAISS similarity + tag boost + price proximity
-        model_loader = self._get_model_loader()
-        scored_products: List[Tuple[Dict, float]] = []
-        
-        for product in filtered_products:
-            # Get embeddings for this product via its Amazon representatives
-            amazon_reps = product.get("amazon_representatives", [])
-            
-            if not amazon_reps:
-                # No representatives, assign low score
-                scored_products.append((product, MIN_SIMILARITY_SCORE))
-                if str(product.get("id")) == "8143046279257":
-                    logger.info("DEBUG: Missing Product has NO amazon representatives")
-                continue
-            
-            # Get embeddings and compute similarity
-            product_embeddings = []
-            for rep in amazon_reps:  # Use all representatives
-                embedding = model_loader.get_embedding(rep)
-                if embedding is not None:
-                    product_embeddings.append(embedding)
-            
-            if not product_embeddings:
-                if str(product.get("id")) == "8143046279257":
-                     logger.info("DEBUG: Missing Product has representatives but NO embeddings found")
-                scored_products.append((product, MIN_SIMILARITY_SCORE))
-                continue
-            
-            # Average the representative embeddings
-            product_vector = np.mean(product_embeddings, axis=0)
-            
-            # Normalize
-            norm = np.linalg.norm(product_vector)
-            if norm > 0:
-                product_vector = product_vector / norm
-            
-            # Compute cosine similarity (base score)
-            similarity = float(np.dot(query_vector, product_vector))
-            
-            if similarity >= MIN_SIMILARITY_SCORE:
-                # Apply tag-boost and price-proximity bonuses (if enabled)
-                tag_boost = 0.0
-                price_boost = 0.0
-                
-                if current_product:
-                    if tag_boost_enabled:
-                        tag_boost = self._compute_tag_boost(current_product, product)
-                        # Scale by merchant-configured weight
-                        if tag_boost_weight != TAG_BOOST_WEIGHT and tag_boost > 0:
-                            tag_boost = tag_boost / TAG_BOOST_WEIGHT * tag_boost_weight
-                    if price_prox_enabled:
-                        price_boost = self._compute_price_proximity(current_product, product)
-                
-                final_score = similarity + tag_boost + price_boost
-                scored_products.append((product, final_score))
-        
-        # Sort by score descending
-        scored_products.sort(key=lambda x: x[1], reverse=True)
-        
+        # Score products using FAISS similarity + tag boost + price proximity.
+
+        # Large candidate sets: let FAISS pick the most similar candidates
+        # and only score/boost that shortlist
+        shortlist = self._shortlist_candidates(index, rows, query_vector, k)
+        if shortlist is not None:
+            rows = rows[shortlist]
+
+        # Products without embeddings keep a low baseline score; products
+        # with embeddings must clear the minimum similarity to be kept.
+        has_vector = index.has_vector
+        scores, boostable = score_candidates(
+            index.matrix,
+            rows,
+            query_vector,
+            has_vector,
+            MIN_SIMILARITY_SCORE,
+        )
+        kept = np.flatnonzero(~has_vector[rows] | boostable)
+
+        # While no boost can lower a score, the k-th best base score is a
+        # floor for the final top k, and candidates that cannot reach it even
+        # with the maximum possible boost are left out of the boost
+        # computation. A negative merchant tag-boost weight penalizes rows
+        # instead, which can drop them below never-penalized pruned rows, so
+        # pruning is skipped then.
+        can_prune = not (tag_boost_enabled and tag_boost_weight < 0)
+        max_possible_boost = (
+            (tag_boost_weight if tag_boost_enabled else 0.0)
+            + (PRICE_PROXIMITY_WEIGHT if price_prox_enabled else 0.0)
+        )
+        if current_product and can_prune and max_possible_boost > 0 and len(kept) > k:
+            kth = len(kept) - k
+            floor = np.partition(scores[kept], kth)[kth]
+            boostable &= scores + max_possible_boost >= floor - 1e-6
+
+        # Apply tag-boost and price-proximity bonuses (if enabled)
+        if current_product and tag_boost_enabled:
+            # Scaled by the merchant-configured weight
+            boost_idx = np.flatnonzero(boostable)
+            scores[boost_idx] += self._compute_tag_boost_vector(
+                index, current_product_id, rows[boost_idx], weight=tag_boost_weight
+            )
+
+        if current_product and price_prox_enabled:
+            boost_idx = np.flatnonzero(boostable)
+            scores[boost_idx] += self._compute_price_proximity_vector(
+                current_product, index.filter_columns["price"][rows[boost_idx]]
+            )
+
+        # Select top k without sorting every candidate
+        top = top_k_indices(scores, kept, k)
+
         # DEBUG: Log top candidates
         logger.info(f"DEBUG: Top 5 candidates:")
-        for i, (p, s) in enumerate(scored_products[:5]):
-            logger.info(f"  {i+1}. {p.get('title')} ({p.get('id')}): {s:.4f}")
-
-        # DEBUG: Check specific missing product
-        missing_id = "8143046279257"
-        # Fix: substring match to handle gid://...
-        missing_p = next((p for p, s in scored_products if missing_id in str(p.get("id"))), None)
-        if missing_p:
-            missing_score = next(s for p, s in scored_products if missing_id in str(p.get("id")))
-            logger.info(f"DEBUG: Missing Product {missing_id} IS in scored list. Score: {missing_score:.4f}")
-            # Recalculate components for debug
-            similarity = 0.0 # Placeholder, hard to get back without refactoring
-            tag_boost = 0.0
-            if current_product and tag_boost_enabled:
-                 tag_boost = self._compute_tag_boost(current_product, missing_p)
-                 if tag_boost_weight != TAG_BOOST_WEIGHT and tag_boost > 0:
-                     tag_boost = tag_boost / TAG_BOOST_WEIGHT * tag_boost_weight
-            logger.info(f"  - Tag boost component: {tag_boost:.4f} (Weight: {tag_boost_weight})")
-            logger.info(f"  - Tags: {missing_p.get('tags')}")
-            logger.info(f"  - Current Tags: {current_product.get('tags')}")
-        else:
-            logger.info(f"DEBUG: Missing Product {missing_id} is NOT in scored list (filtered out earlier?)")
-            
-        # Take top k
-        top_products = scored_products[:k]
-        
-        # Build response
-        recommendations = []
-        for product, score in top_products:
-            # Generate recommendation reason
-            reason = self._generate_recommendation_reason(
-                product=product,
-                current_product_id=current_product_id,
-                user_history=user_history
-            )
-            
-            recommendations.append({
-                "shopify_product_id": product.get("id"),
-                "title": product.get("title", ""),
-                "category": product.get("category", ""),
-                "price": product.get("price", "0"),
-                "image": product.get("image", ""),
-                "tags": product.get("tags", []),
-                "score": round(score, 3),
-                "reason": reason
-            })
-        
+        for i, idx in enumerate(top[:5]):
+            p = product_list[rows[idx]]
+            logger.info(f"  {i+1}. {p.get('title')} ({p.get('id')}): {scores[idx]:.4f}")
+
+        # DEBUG: Trace a specific product (set DEBUG_TRACE_PRODUCT_ID)
+        if DEBUG_TRACE_PRODUCT_ID:
+            missing_id = DEBUG_TRACE_PRODUCT_ID
+            # Direct row lookup (accepts either the bare ID or its gid:// form)
+            missing_row = positions.get(missing_id)
+            if missing_row is None:
+                missing_row = positions.get(f"gid://shopify/Product/{missing_id}")
+            missing_idx = None
+            if missing_row is not None:
+                hits = np.flatnonzero(rows[kept] == missing_row)
+                if hits.size:
+                    missing_idx = int(kept[hits[0]])
+            if missing_idx is not None:
+                missing_p = product_list[rows[missing_idx]]
+                missing_score = scores[missing_idx]
+                logger.info(f"DEBUG: Missing Product {missing_id} IS in scored list. Score: {missing_score:.4f}")
+                tag_boost = 0.0
+                if current_product and tag_boost_enabled:
+                    tag_boost = self._compute_tag_boost(current_product, missing_p)
+                    if tag_boost_weight != TAG_BOOST_WEIGHT and tag_boost > 0:
+                        tag_boost = tag_boost / TAG_BOOST_WEIGHT * tag_boost_weight
+                logger.info(f"  - Tag boost component: {tag_boost:.4f} (Weight: {tag_boost_weight})")
+                logger.info(f"  - Tags: {missing_p.get('tags')}")
+                if current_product:
+                    logger.info(f"  - Current Tags: {current_product.get('tags')}")
+            else:
+                logger.info(f"DEBUG: Missing Product {missing_id} is NOT in scored list (filtered out earlier?)")
+
+        # Build response (only the top k products are materialized).
+        # The reason depends only on the request, not on the product.
+        reason = self._generate_recommendation_reason(
+            product=None,
+            current_product_id=current_product_id,
+            user_history=user_history
+        )
+        templates = index.response_templates
+        recommendations = [
+            self._build_response(templates[rows[idx]], round(float(scores[idx]), 3), reason)
+            for idx in top
+        ]
+
         logger.info(f"Returning {len(recommendations)} recommendations")
         return recommendations
     
     def _generate_recommendation_reason(
         self,
-        product: Dict[str, Any],
+        product: Optional[Dict[str, Any]],
         current_product_id: str,
         user_history: Optional[Dict[str, List[str]]]
     ) -> str:
@@ -916,7 +1495,8 @@ class ProductRecommender:
         Generate a human-readable reason for the recommendation.
         
         Args:
-            product: Recommended product
+            product: Recommended product (optional; reasons are currently
+                request-level, so one reason is shared by all results)
             current_product_id: Currently viewed product
             user_history: User's history
             
@@ -968,6 +1548,19 @@ class ProductRecommender:
         """
         logger.info(f"Getting {k} popular products for {merchant_id}")
         
+        index = self._merchant_index(merchant_id)
+        if index is None:
+            return []
+        cache_key = self._popular_cache_key(
+            merchant_id, index.version, category, user_location, user_preferences, k,
+            merchant_settings
+        )
+        with self._popular_lock:
+            cached = self._popular_cache.get(cache_key)
+        if cached is not None and cached[0] > time.monotonic():
+            logger.debug(f"Popular products cache hit for {merchant_id}")
+            return self._popular_responses(index, cached[1])
+        
         filters_cfg = {}
         if merchant_settings and isinstance(merchant_settings, dict):
             filters_cfg = merchant_settings.get("filters", {})
@@ -976,40 +1569,86 @@ class ProductRecommender:
         effective_category = category if same_category_only else None
 
         # Get merchant products with optional category scope.
-        products = self.get_merchant_products(merchant_id, effective_category)
+        candidate_rows = self._candidate_rows(index, effective_category)
+        if not len(candidate_rows):
+            return []
         
-        if len(products) < k and effective_category:
+        if len(candidate_rows) < k and effective_category:
             logger.debug(
-                f"Category '{effective_category}' has only {len(products)} products; "
+                f"Category '{effective_category}' has only {len(candidate_rows)} products; "
                 "keeping strict same-category filtering."
             )
         
-        # Apply filters
-        filtered = apply_all_filters(
-            products=products,
+        # Apply filters over the candidate rows of the whole catalog
+        keep = apply_all_filters(
+            products=index.products,
             user_location=user_location,
             user_preferences=user_preferences,
             target_category=effective_category,
             merchant_settings=merchant_settings,
+            return_indices=True,
+            columns=index.filter_columns,
+            rows=candidate_rows,
         )
         
         # For now, return first k (could add popularity scoring later)
-        popular = filtered[:k]
+        popular_rows = keep[:k]
         
-        # Format response
+        self._store_popular(cache_key, popular_rows)
+        return self._popular_responses(index, popular_rows)
+
+    def _popular_responses(self, index: MerchantIndex, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """Format popular products from the templates cached at registration."""
+        templates = index.response_templates
         return [
-            {
-                "shopify_product_id": p.get("id"),
-                "title": p.get("title", ""),
-                "category": p.get("category", ""),
-                "price": p.get("price", "0"),
-                "image": p.get("image", ""),
-                "tags": p.get("tags", []),
-                "score": 1.0,  # Popular products get max score
-                "reason": "Popular in this category"
-            }
-            for p in popular
+            # Popular products get max score
+            self._build_response(templates[row], 1.0, "Popular in this category")
+            for row in rows
         ]
+
+    @staticmethod
+    def _popular_cache_key(
+        merchant_id: str,
+        version: int,
+        category: Optional[str],
+        user_location: Optional[str],
+        user_preferences: Optional[Dict[str, Any]],
+        k: int,
+        merchant_settings: Optional[Dict[str, Any]]
+    ) -> Tuple:
+        """Cache key covering every input that affects popular products."""
+        return (
+            merchant_id,
+            version,
+            category,
+            k,
+            user_location,
+            json.dumps(user_preferences, sort_keys=True, default=str),
+            json.dumps(merchant_settings, sort_keys=True, default=str),
+        )
+
+    def _store_popular(self, cache_key: Tuple, rows: np.ndarray) -> None:
+        """
+        Store the rows of a popular-products response.
+
+        Expired entries and entries for an older snapshot of the same
+        merchant are dropped first (they can never be served again); if the
+        cache is still full, the oldest entry is evicted.
+        """
+        if POPULAR_CACHE_TTL_SECONDS <= 0:
+            return
+        merchant_id, version = cache_key[0], cache_key[1]
+        now = time.monotonic()
+        with self._popular_lock:
+            stale = [
+                key for key, (expires_at, _) in self._popular_cache.items()
+                if expires_at <= now or (key[0] == merchant_id and key[1] != version)
+            ]
+            for key in stale:
+                del self._popular_cache[key]
+            if len(self._popular_cache) >= POPULAR_CACHE_MAX_ENTRIES:
+                del self._popular_cache[next(iter(self._popular_cache))]
+            self._popular_cache[cache_key] = (now + POPULAR_CACHE_TTL_SECONDS, rows)
     
     def clear_merchant(self, merchant_id: str) -> bool:
         """
@@ -1023,12 +1662,29 @@ class ProductRecommender:
         """
         if merchant_id in self._merchant_products:
             del self._merchant_products[merchant_id]
-            if merchant_id in self._category_index:
-                del self._category_index[merchant_id]
+            self._merchant_indexes.pop(merchant_id, None)
+            self._merchant_version[merchant_id] = self._merchant_version.get(merchant_id, 0) + 1
             logger.info(f"Cleared merchant {merchant_id}")
             return True
         return False
 
+    def reset(self) -> None:
+        """
+        Drop every merchant's products, indexes and cached responses.
+
+        The embedding cache is emptied too. The model loader and the
+        category representatives only depend on the model, so they are kept
+        and a reset instance needs no re-initialization.
+        """
+        for merchant_id in list(self._merchant_products):
+            self.clear_merchant(merchant_id)
+        self._merchant_indexes.clear()
+        with self._popular_lock:
+            self._popular_cache.clear()
+        with self._embedding_lock:
+            self._embedding_cache.clear()
+        logger.info("ProductRecommender reset")
+
 
 # Singleton accessor function
 def get_recommender() -> ProductRecommender:
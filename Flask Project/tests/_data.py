@@ -0,0 +1,158 @@
+"""
+Test data and JSON helpers shared by the test modules and the load driver.
+
+Kept out of the test modules so that importing the sample catalog or the
+pre-serialized request bodies does not also collect a module's tests.
+"""
+
+import json
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+_SAMPLE_PRODUCTS_RAW = [
+    {
+        "id": "shop_001",
+        "title": "Organic Moisturizing Face Cream",
+        "product_type": "Beauty",
+        "tags": ["skincare", "vegan", "organic"],
+        "price": "29.99",
+        "image": "https://example.com/cream.jpg"
+    },
+    {
+        "id": "shop_002",
+        "title": "Anti-Aging Vitamin C Serum",
+        "product_type": "Beauty",
+        "tags": ["skincare", "anti-aging", "vegan"],
+        "price": "39.99",
+        "image": "https://example.com/serum.jpg"
+    },
+    {
+        "id": "shop_003",
+        "title": "Hydrating Eye Cream",
+        "product_type": "Beauty",
+        "tags": ["skincare", "hydrating"],
+        "price": "24.99",
+        "image": "https://example.com/eye-cream.jpg"
+    },
+    {
+        "id": "shop_004",
+        "title": "Winter Wool Coat",
+        "product_type": "Fashion",
+        "tags": ["winter", "coat", "clothing", "wool"],
+        "price": "199.99",
+        "image": "https://example.com/coat.jpg"
+    },
+    {
+        "id": "shop_005",
+        "title": "Summer Cotton Dress",
+        "product_type": "Fashion",
+        "tags": ["summer", "dress", "clothing", "cotton"],
+        "price": "49.99",
+        "image": "https://example.com/dress.jpg"
+    },
+    {
+        "id": "shop_006",
+        "title": "iPhone 15 Pro Case",
+        "product_type": "Electronics",
+        "tags": ["phone", "accessory", "case", "iphone"],
+        "price": "24.99",
+        "image": "https://example.com/case.jpg"
+    },
+    {
+        "id": "shop_007",
+        "title": "Wireless Bluetooth Earbuds",
+        "product_type": "Electronics",
+        "tags": ["audio", "wireless", "bluetooth"],
+        "price": "79.99",
+        "image": "https://example.com/earbuds.jpg"
+    },
+    {
+        "id": "shop_008",
+        "title": "Eco-Friendly Bamboo Utensil Set",
+        "product_type": "Home",
+        "tags": ["kitchen", "sustainable", "eco-friendly", "bamboo"],
+        "price": "19.99",
+        "image": "https://example.com/utensils.jpg"
+    }
+]
+
+# Shared by every test, so frozen: a test (or the recommender) writing into
+# a sample product raises instead of leaking into later tests
+SAMPLE_PRODUCTS = tuple(MappingProxyType(product) for product in _SAMPLE_PRODUCTS_RAW)
+
+# API tests only check routing and plumbing, not ranking, so they register
+# just two (same-category, vegan) products
+SAMPLE_PRODUCTS_MIN = SAMPLE_PRODUCTS[:2]
+
+TEST_MERCHANT_ID = "test-store.myshopify.com"
+API_MERCHANT_ID = "test-api-store"
+
+
+def dump_json(payload) -> bytes:
+    """Serialize a request body, with orjson when it is installed."""
+    # default=dict encodes the frozen sample products as plain objects
+    if orjson is not None:
+        return orjson.dumps(payload, default=dict)
+    return json.dumps(payload, default=dict).encode("utf-8")
+
+
+def parse_json(body: bytes):
+    """Parse a response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+OrjsonProvider = None
+if orjson is not None:
+    from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+    class OrjsonProvider(JSONProvider):
+        """Flask JSON provider backed by orjson, used by the test app."""
+
+        @staticmethod
+        def _encode(obj) -> bytes:
+            # Fall back to Flask's encoder for dates, decimals, dataclasses...
+            # No orjson options: a numpy value in a response must fail here
+            # as it would with the production provider
+            return orjson.dumps(obj, default=DefaultJSONProvider.default)
+
+        def dumps(self, obj, **kwargs) -> str:
+            return self._encode(obj).decode("utf-8")
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self._encode(obj), mimetype="application/json")
+
+
+# Request bodies are serialized once here and posted as raw bytes, so the
+# API tests don't re-encode their products on every request
+REGISTER_BODY = dump_json({
+    "merchant_id": API_MERCHANT_ID,
+    "products": SAMPLE_PRODUCTS_MIN
+})
+RECOMMEND_BODY = dump_json({
+    "merchant_id": API_MERCHANT_ID,
+    "current_product_id": "shop_001",
+    "user_location": "Pakistan",
+    "user_preferences": {"vegan": True},
+    "k": 5
+})
+REGISTER_AND_RECOMMEND_BODY = dump_json({
+    "merchant_id": API_MERCHANT_ID,
+    "products": SAMPLE_PRODUCTS_MIN,
+    "query": {"current_product_id": "shop_001", "k": 5}
+})
+POPULAR_BODY = dump_json({
+    "merchant_id": API_MERCHANT_ID,
+    "category": "beauty",
+    "k": 5
+})
@@ -0,0 +1,60 @@
+"""
+Shared pytest configuration for the test suite.
+"""
+
+import pytest
+
+WARM_MERCHANT_ID = "_warm"
+
+
+def pytest_addoption(parser):
+    """Load settings for the perf tests."""
+    group = parser.getgroup("perf", "load tests (-m perf)")
+    group.addoption("--requests", type=int, default=200, help="requests per load test (default: 200)")
+    group.addoption("--concurrency", type=int, default=16, help="max requests in flight (default: 16)")
+
+
+def pytest_configure(config):
+    """Register the suite's custom markers."""
+    config.addinivalue_line(
+        "markers",
+        "perf: load tests against a gunicorn server (run with -m perf)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip perf tests unless they were selected with -m."""
+    if "perf" in (config.getoption("-m") or ""):
+        return
+    skip_perf = pytest.mark.skip(reason="perf tests only run with -m perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip_perf)
+
+
+@pytest.fixture(scope="session")
+def warm_app():
+    """
+    TESTING app that has already served one recommend request.
+    
+    The first recommend call pays for lazy model/FAISS loading and the
+    scoring kernel's JIT compile. Those are per process, so requesting this
+    fixture keeps them out of the timing of whichever API test runs first,
+    whichever app that test talks to. Only built when an API test needs it.
+    """
+    from api.app import create_app
+    from tests._data import SAMPLE_PRODUCTS, dump_json
+    
+    app = create_app({"TESTING": True})
+    client = app.test_client()
+    client.post(
+        "/api/merchant/register",
+        data=dump_json({"merchant_id": WARM_MERCHANT_ID, "products": SAMPLE_PRODUCTS}),
+        content_type="application/json"
+    )
+    client.post(
+        "/api/recommend",
+        json={"merchant_id": WARM_MERCHANT_ID, "current_product_id": "shop_001", "k": 1}
+    )
+    client.delete(f"/api/merchant/{WARM_MERCHANT_ID}")
+    return app
@@ -0,0 +1,107 @@
+"""
+Concurrent load driver for the recommend endpoint.
+
+Fires N POST /api/recommend requests with at most C in flight at a time
+(asyncio.gather over a semaphore) and reports throughput and p50/p95/p99
+latency. Used by the perf tests and runnable on its own:
+
+    python tests/load_test.py --requests 500 --concurrency 32
+    python tests/load_test.py --base-url http://127.0.0.1:5001
+
+Without --base-url the app is driven in-process over ASGI, which measures
+the app itself rather than a server in front of it.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from tests._data import REGISTER_BODY, RECOMMEND_BODY
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+async def hammer(client: httpx.AsyncClient, n_requests: int, concurrency: int) -> List[float]:
+    """
+    Send n_requests recommend requests, at most `concurrency` at a time.
+
+    Returns:
+        Latency of each request in seconds
+
+    Raises:
+        AssertionError: if any request does not return 200
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/api/recommend", content=RECOMMEND_BODY, headers=JSON_HEADERS)
+            elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.text
+        return elapsed
+
+    return await asyncio.gather(*(one() for _ in range(n_requests)))
+
+
+def latency_summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and p50/p95/p99 latency (ms) of a load run."""
+    latencies_ms = np.asarray(latencies) * 1000
+    summary = {"requests_per_second": round(len(latencies) / elapsed, 1)}
+    for q in (50, 95, 99):
+        summary[f"p{q}_ms"] = round(float(np.percentile(latencies_ms, q)), 2)
+    return summary
+
+
+def in_process_client() -> httpx.AsyncClient:
+    """AsyncClient driving a fresh TESTING app over ASGI, with products registered."""
+    from asgiref.wsgi import WsgiToAsgi
+    from api.app import create_app
+
+    app = create_app({"TESTING": True})
+    app.test_client().post("/api/merchant/register", data=REGISTER_BODY, content_type="application/json")
+    transport = httpx.ASGITransport(app=WsgiToAsgi(app))
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def run(n_requests: int, concurrency: int, base_url: str = None) -> Dict[str, float]:
+    """Register the sample products, run the load and summarize it."""
+    if base_url:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0)
+        await client.post("/api/merchant/register", content=REGISTER_BODY, headers=JSON_HEADERS)
+    else:
+        client = in_process_client()
+
+    async with client:
+        start = time.perf_counter()
+        latencies = await hammer(client, n_requests, concurrency)
+        elapsed = time.perf_counter() - start
+    return latency_summary(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test POST /api/recommend")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max requests in flight")
+    parser.add_argument("--base-url", help="Server to test (default: in-process ASGI)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args.requests, args.concurrency, args.base_url))
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"Throughput: {summary['requests_per_second']} req/s")
+    print(f"Latency p50: {summary['p50_ms']} ms  p95: {summary['p95_ms']} ms  p99: {summary['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
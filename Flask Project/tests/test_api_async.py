@@ -0,0 +1,89 @@
+"""
+Async integration tests for the Flask API.
+
+The WSGI app is served through asgiref's WsgiToAsgi adapter and driven by
+an httpx.AsyncClient, so a test can issue many requests concurrently with
+asyncio.gather. Skipped when httpx, asgiref or pytest-asyncio are not
+installed.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest_asyncio = pytest.importorskip("pytest_asyncio")
+WsgiToAsgi = pytest.importorskip("asgiref.wsgi").WsgiToAsgi
+
+from api.app import create_app
+from tests.load_test import hammer, latency_summary
+from tests._data import REGISTER_BODY, RECOMMEND_BODY, parse_json
+
+
+# Load the model and compile the scoring kernel before the first test
+pytestmark = pytest.mark.usefixtures("warm_app")
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@pytest.fixture(scope="module")
+def asgi_app():
+    """Flask app wrapped as an ASGI app, with SAMPLE_PRODUCTS_MIN registered."""
+    app = create_app({"TESTING": True})
+    app.test_client().post(
+        "/api/merchant/register",
+        data=REGISTER_BODY,
+        content_type="application/json"
+    )
+    return WsgiToAsgi(app)
+
+
+@pytest_asyncio.fixture
+async def async_client(asgi_app):
+    """httpx client talking to the app in-process over ASGI."""
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_recommend_endpoint(async_client):
+    """Recommend endpoint should return recommendations."""
+    response = await async_client.post(
+        "/api/recommend", content=RECOMMEND_BODY, headers=JSON_HEADERS
+    )
+
+    assert response.status_code == 200
+    data = parse_json(response.content)
+    assert data["success"] is True
+    assert "recommendations" in data
+
+
+@pytest.mark.asyncio
+async def test_concurrent_recommend_requests_agree(async_client):
+    """Concurrent identical requests should all succeed with the same results."""
+    responses = await asyncio.gather(*(
+        async_client.post("/api/recommend", content=RECOMMEND_BODY, headers=JSON_HEADERS)
+        for _ in range(8)
+    ))
+
+    assert all(response.status_code == 200 for response in responses)
+    results = [parse_json(response.content)["recommendations"] for response in responses]
+    assert all(result == results[0] for result in results)
+
+
+@pytest.mark.perf
+@pytest.mark.asyncio
+async def test_concurrent_recommend_load(async_client, request, record_property):
+    """Load run of --requests requests, --concurrency at a time; percentiles are recorded."""
+    n_requests = request.config.getoption("--requests")
+    concurrency = request.config.getoption("--concurrency")
+
+    start = time.perf_counter()
+    latencies = await hammer(async_client, n_requests, concurrency)
+    elapsed = time.perf_counter() - start
+
+    assert len(latencies) == n_requests
+    for name, value in latency_summary(latencies, elapsed).items():
+        record_property(name, value)
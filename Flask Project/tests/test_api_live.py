@@ -0,0 +1,189 @@
+"""
+Integration tests against a running API server.
+
+Set LIVE_API_URL (e.g. http://127.0.0.1:5001) to point these tests at a
+real server. Without it they run against the app served by uvicorn (through
+a2wsgi's WSGI adapter) on a background thread, and are skipped when uvicorn
+or a2wsgi is not installed. All requests go through one keep-alive
+httpx.Client so the TCP connection is reused across tests instead of being
+set up again for every request.
+
+The perf tests start their own gunicorn server (gevent workers when gevent
+is installed) and only run when selected with ``-m perf``.
+"""
+
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from tests.load_test import latency_summary
+from tests._data import (
+    REGISTER_BODY,
+    RECOMMEND_BODY,
+    REGISTER_AND_RECOMMEND_BODY,
+    parse_json
+)
+
+# Load the model and compile the scoring kernel before the first test
+pytestmark = pytest.mark.usefixtures("warm_app")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@pytest.fixture(scope="session")
+def uvicorn_base_url():
+    """Base URL of the app served by uvicorn on a background thread."""
+    uvicorn = pytest.importorskip("uvicorn")
+    # Not asgiref's WsgiToAsgi: under uvicorn it intermittently stalls on
+    # the second request of a keep-alive connection
+    WSGIMiddleware = pytest.importorskip("a2wsgi").WSGIMiddleware
+    from api.app import create_app
+    
+    server = uvicorn.Server(uvicorn.Config(
+        WSGIMiddleware(create_app({"TESTING": True})),
+        host="127.0.0.1",
+        port=0,
+        lifespan="off",
+        log_level="error"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 30
+        while not server.started:
+            if not thread.is_alive() or time.monotonic() > deadline:
+                pytest.fail("uvicorn did not start")
+            time.sleep(0.05)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+@pytest.fixture(scope="session")
+def live_base_url(request):
+    """Base URL of the server under test: LIVE_API_URL, else local uvicorn."""
+    base_url = os.getenv("LIVE_API_URL")
+    if base_url:
+        return base_url.rstrip("/")
+    return request.getfixturevalue("uvicorn_base_url")
+
+
+@pytest.fixture(scope="session")
+def live_client(live_base_url):
+    """One pooled, keep-alive HTTP client shared by the whole session."""
+    limits = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+    with httpx.Client(base_url=live_base_url, limits=limits, timeout=30.0) as client:
+        client.post("/api/merchant/register", content=REGISTER_BODY, headers=JSON_HEADERS)
+        yield client
+
+
+def _wait_for_gunicorn_port(process: subprocess.Popen, log_path: Path, timeout: float = 60.0) -> int:
+    """Wait for gunicorn to log its bound address and return the port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        match = re.search(r"Listening at: http://127\.0\.0\.1:(\d+)", log_path.read_text())
+        if match:
+            return int(match.group(1))
+        if process.poll() is not None:
+            break
+        time.sleep(0.1)
+    pytest.fail(f"gunicorn did not start:\n{log_path.read_text()}")
+
+
+@pytest.fixture(scope="session")
+def gunicorn_base_url(tmp_path_factory):
+    """Base URL of a gunicorn server started for the perf tests."""
+    pytest.importorskip("gunicorn")
+    worker_class = "gevent" if importlib.util.find_spec("gevent") else "gthread"
+    workers = min(os.cpu_count() or 1, 8)
+    
+    # Logged to a file rather than a pipe, so the per-request log lines
+    # can't fill a pipe buffer and block the server
+    log_path = tmp_path_factory.mktemp("gunicorn") / "gunicorn.log"
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn",
+                "-k", worker_class,
+                "-w", str(workers),
+                "-b", "127.0.0.1:0",
+                "api.app:app"
+            ],
+            cwd=PROJECT_ROOT,
+            stdout=log,
+            stderr=subprocess.STDOUT
+        )
+    try:
+        port = _wait_for_gunicorn_port(process, log_path)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+@pytest.mark.xdist_group("api_live")
+class TestLiveServer:
+    """End-to-end tests over real HTTP."""
+
+    def test_health_endpoint(self, live_client):
+        """Health endpoint should return 200."""
+        response = live_client.get("/health")
+
+        assert response.status_code == 200
+        assert parse_json(response.content)["status"] == "healthy"
+
+    def test_recommend_endpoint(self, live_client):
+        """Recommend endpoint should return recommendations."""
+        response = live_client.post(
+            "/api/recommend", content=RECOMMEND_BODY, headers=JSON_HEADERS
+        )
+
+        assert response.status_code == 200
+        data = parse_json(response.content)
+        assert data["success"] is True
+        assert "recommendations" in data
+
+
+@pytest.mark.perf
+class TestGunicornLoad:
+    """Load tests against a gunicorn server with several workers."""
+
+    def test_concurrent_register_and_recommend(self, gunicorn_base_url, request, record_property):
+        """Concurrent requests should all succeed; latency percentiles are recorded."""
+        n_requests = request.config.getoption("--requests")
+        concurrency = request.config.getoption("--concurrency")
+        # Each worker process has its own in-memory merchants, so every
+        # request registers the products it recommends from
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        with httpx.Client(base_url=gunicorn_base_url, limits=limits, timeout=60.0) as client:
+            def timed_post(_):
+                start = time.perf_counter()
+                response = client.post(
+                    "/api/merchant/register_and_recommend",
+                    content=REGISTER_AND_RECOMMEND_BODY,
+                    headers=JSON_HEADERS
+                )
+                return response.status_code, time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(timed_post, range(n_requests)))
+            elapsed = time.perf_counter() - start
+
+        assert all(status == 200 for status, _ in results)
+        summary = latency_summary([latency for _, latency in results], elapsed)
+        for name, value in summary.items():
+            record_property(name, value)
@@ -20,7 +20,11 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from src.category_classifier import CategoryClassifier, get_category_classifier
+from src.category_classifier import (
+    CategoryClassifier,
+    get_category_classifier,
+    preload_category_classifier,
+)
 from config import CATEGORY_KEYWORDS
 
 
@@ -245,6 +249,22 @@ class TestSingleton:
         clf2 = get_category_classifier()
         assert clf1 is clf2
 
+    def test_preload_never_trains_or_writes(self, classifier, monkeypatch):
+        """Preloading should only load a saved model, never train one."""
+        import src.category_classifier as category_classifier
+
+        monkeypatch.setattr(category_classifier, "_instance", None)
+        monkeypatch.setattr(category_classifier, "_DEFAULT_MODEL_PATH", classifier.model_path)
+
+        assert preload_category_classifier() is False
+        assert not classifier.model_path.exists()
+        assert category_classifier._instance is None
+
+        classifier.save()
+        assert preload_category_classifier() is True
+        assert category_classifier._instance._is_trained
+        classifier.model_path.unlink()
+
 
 # =============================================================================
 # TEST: INTEGRATION WITH RECOMMENDER
@@ -274,6 +294,44 @@ class TestRecommenderIntegration:
         assert 0.0 <= confidence <= 1.0
         assert method in {"ml", "keywords", "ml+keywords"}
 
+    def test_detect_category_is_cached_for_repeated_products(self, recommender):
+        """Variants sharing title/type/tags (any case) are classified once."""
+        from src.recommender import _classify_category
+
+        variant = {
+            "title": "Cotton Crew Neck T-Shirt",
+            "product_type": "Apparel",
+            "tags": ["Cotton", "casual"]
+        }
+        first = recommender._detect_category(variant)
+        hits_before = _classify_category.cache_info().hits
+
+        shouted = dict(variant, title=variant["title"].upper(), tags=["COTTON", "Casual"])
+        assert recommender._detect_category(shouted) == first
+        assert _classify_category.cache_info().hits == hits_before + 1
+
+    def test_keyword_automaton_matches_substring_scan(self, monkeypatch):
+        """Aho-Corasick keyword scoring matches the plain substring loop."""
+        import src.recommender as recommender_module
+
+        if recommender_module.ahocorasick is None:
+            pytest.skip("pyahocorasick not installed")
+
+        texts = [
+            ("wireless bluetooth headphones", "electronics", ()),
+            ("organic face moisturizer", "", ("skincare", "vegan")),
+            ("cotton summer dress", "apparel", ("women",)),
+            ("ceramic coffee mug", "kitchen", ("gift",)),
+            ("mystery box", "", ()),
+        ]
+        with_automaton = [recommender_module._keyword_category(*t) for t in texts]
+
+        monkeypatch.setattr(recommender_module, "ahocorasick", None)
+        monkeypatch.setattr(recommender_module, "_keyword_automaton", None)
+        without_automaton = [recommender_module._keyword_category(*t) for t in texts]
+
+        assert with_automaton == without_automaton
+
     def test_registration_stores_confidence(self, recommender):
         """Registered products should have category_confidence and category_method."""
         products = [
@@ -4,6 +4,19 @@ from src.filters import apply_all_filters, apply_location_filter
 from src.recommender import ProductRecommender
 
 
+class _FakeModelLoader:
+    """Model loader stand-in whose embeddings come from ``get_embedding(rep)``."""
+
+    is_available = True
+
+    def __init__(self, get_embedding):
+        self.get_embedding = get_embedding
+
+
+def _constant_embedding(_rep):
+    return np.array([1.0, 0.0], dtype=float)
+
+
 def _make_recommender_with_products():
     recommender = ProductRecommender()
     merchant_id = "settings-test.myshopify.com"
@@ -37,10 +50,31 @@ def _make_recommender_with_products():
         },
     }
     recommender._merchant_products[merchant_id] = products
-    recommender._category_index[merchant_id] = {
-        "beauty": ["p1", "p2"],
-        "electronics": ["p3"],
+    return recommender, merchant_id
+
+
+def _make_recommender_with_catalog(num_products, embeddings, query):
+    """
+    Recommender with ``num_products`` beauty products ``p{i}``, each
+    represented by ``rep-{i}`` in ``embeddings``, whose requests all use
+    ``query`` as their query vector. Tests adjust the products in
+    ``_merchant_products`` before the first request.
+    """
+    recommender = ProductRecommender()
+    merchant_id = "catalog-test.myshopify.com"
+    recommender._merchant_products[merchant_id] = {
+        f"p{i}": {
+            "id": f"p{i}",
+            "title": f"Product {i}",
+            "category": "beauty",
+            "tags": [],
+            "price": "30.00",
+            "amazon_representatives": [f"rep-{i}"],
+        }
+        for i in range(num_products)
     }
+    recommender._get_model_loader = lambda: _FakeModelLoader(embeddings.get)
+    recommender._build_weighted_query_vector = lambda **_kwargs: (query, "beauty")
     return recommender, merchant_id
 
 
@@ -57,6 +91,65 @@ def test_location_filter_accepts_iso_country_code():
     assert "winter" in filtered_ids
 
 
+def test_tag_filters_keep_substring_matching_on_title_and_tags():
+    from src.filters import apply_vegan_filter
+
+    products = [
+        {"id": "title-only", "title": "Heavy WOOL overcoat", "tags": []},
+        {"id": "tag-substring", "title": "Blend", "tags": ["Vegan-Friendly"]},
+        {"id": "plain", "title": "Cotton Tee", "tags": ["basics"]},
+    ]
+
+    hot_ids = [p["id"] for p in apply_location_filter(products, "PK")]
+    vegan_ids = [p["id"] for p in apply_vegan_filter(products)]
+
+    assert "title-only" not in hot_ids
+    assert "plain" in hot_ids
+    assert vegan_ids == ["tag-substring"]
+
+
+def test_filter_columns_give_same_results_as_per_product_filters():
+    from src.filters import build_filter_columns
+
+    products = [
+        {"id": "cheap", "category": "Beauty", "price": "15.00", "tags": ["vegan"]},
+        {"id": "mid", "category": "beauty", "price": "49.99", "tags": ["wool"]},
+        {"id": "formatted", "category": "beauty", "price": "$1,200", "tags": ["vegan"]},
+        {"id": "unparsed", "category": "home", "price": "n/a", "tags": ["vegan", "summer"]},
+        {"id": "missing", "category": "beauty", "tags": ["eco-friendly"]},
+    ]
+    columns = build_filter_columns(products)
+    requests = [
+        {"user_preferences": {"price_range": "low"}},
+        {"user_preferences": {"price_range": "high", "vegan": True}},
+        {"user_preferences": {"sustainable": True}, "target_category": "beauty"},
+        {"user_location": "PK", "target_category": "beauty "},
+        {"user_location": "Canada", "user_preferences": {"vegan": True}},
+    ]
+
+    for request in requests:
+        expected = apply_all_filters(products, **request)
+        assert apply_all_filters(products, columns=columns, **request) == expected
+        assert list(
+            apply_all_filters(products, columns=columns, return_indices=True, **request)
+        ) == [products.index(p) for p in expected]
+
+    # Filtering a subset by position against the full columns matches
+    # filtering the subset's own dicts.
+    rows = np.array([4, 0, 3, 2], dtype=np.int32)
+    subset = [products[row] for row in rows]
+    for request in requests:
+        expected = apply_all_filters(subset, **request)
+        assert apply_all_filters(products, columns=columns, rows=rows, **request) == expected
+        assert list(apply_all_filters(
+            products, columns=columns, rows=rows, return_indices=True, **request
+        )) == [products.index(p) for p in expected]
+
+    assert [p["id"] for p in apply_all_filters(
+        products, user_preferences={"price_range": "high"}, columns=columns
+    )] == ["formatted", "unparsed"]
+
+
 def test_same_category_filter_can_be_disabled_via_settings():
     products = [
         {"id": "beauty-1", "category": "beauty", "tags": []},
@@ -75,21 +168,31 @@ def test_same_category_filter_can_be_disabled_via_settings():
     assert "electronics-1" in filtered_ids
 
 
-def test_exclude_purchased_toggle_is_respected():
-    recommender, merchant_id = _make_recommender_with_products()
+def test_apply_all_filters_can_return_positions():
+    products = [
+        {"id": "beauty-1", "category": "beauty", "tags": []},
+        {"id": "electronics-1", "category": "electronics", "tags": []},
+        {"id": "beauty-2", "category": "beauty", "tags": []},
+    ]
+
+    kept = apply_all_filters(products=products, target_category="beauty")
+    positions = apply_all_filters(
+        products=products, target_category="beauty", return_indices=True
+    )
 
-    class _FakeModelLoader:
-        is_available = True
+    assert positions.dtype == np.int32
+    assert positions.tolist() == [0, 2]
+    assert [products[i] for i in positions] == kept
 
-        @staticmethod
-        def get_embedding(_rep):
-            return np.array([1.0, 0.0], dtype=float)
+
+def test_exclude_purchased_toggle_is_respected():
+    recommender, merchant_id = _make_recommender_with_products()
 
     recommender._build_weighted_query_vector = lambda **_kwargs: (
         np.array([1.0, 0.0], dtype=float),
         "beauty",
     )
-    recommender._get_model_loader = lambda: _FakeModelLoader()
+    recommender._get_model_loader = lambda: _FakeModelLoader(_constant_embedding)
 
     user_history = {"viewed": [], "added_to_cart": [], "purchased": ["p2"]}
     merchant_settings = {"filters": {"sameCategoryOnly": False}}
@@ -144,3 +247,394 @@ def test_fallback_popular_obeys_same_category_setting():
 
     assert all(rec["category"] == "beauty" for rec in same_category_recs)
     assert any(rec["category"] == "electronics" for rec in cross_category_recs)
+
+
+def test_popular_products_cache_is_invalidated_by_reindexing():
+    recommender, merchant_id = _make_recommender_with_products()
+
+    first = recommender.get_popular_products(merchant_id, category="beauty", k=5)
+    first[0]["title"] = "mutated by caller"
+    second = recommender.get_popular_products(merchant_id, category="beauty", k=5)
+
+    assert [r["shopify_product_id"] for r in second] == ["p1", "p2"]
+    assert second[0]["title"] == "Beauty Current"
+    assert len(recommender._popular_cache) == 1
+
+    products = recommender._merchant_products[merchant_id]
+    del products["p2"]
+    recommender._index_merchant_products(merchant_id)
+    third = recommender.get_popular_products(merchant_id, category="beauty", k=5)
+
+    assert [r["shopify_product_id"] for r in third] == ["p1"]
+    # Storing the new snapshot's response drops the old snapshot's entry
+    assert len(recommender._popular_cache) == 1
+
+
+def test_popular_cache_drops_expired_entries_and_stays_bounded(monkeypatch):
+    import types
+
+    import src.recommender as recommender_module
+
+    recommender, merchant_id = _make_recommender_with_products()
+    clock = [1000.0]
+    monkeypatch.setattr(recommender_module, "time", types.SimpleNamespace(monotonic=lambda: clock[0]))
+    monkeypatch.setattr(recommender_module, "POPULAR_CACHE_MAX_ENTRIES", 2)
+
+    recommender.get_popular_products(merchant_id, category="beauty", k=5)
+    clock[0] += recommender_module.POPULAR_CACHE_TTL_SECONDS + 1
+    recommender.get_popular_products(merchant_id, category="electronics", k=5)
+    assert [key[2] for key in recommender._popular_cache] == ["electronics"]
+
+    for k in range(1, 6):
+        recommender.get_popular_products(merchant_id, category="beauty", k=k)
+    assert len(recommender._popular_cache) == 2
+
+
+def test_mutating_response_tags_does_not_touch_catalog_or_cache():
+    recommender, merchant_id = _make_recommender_with_products()
+
+    recommender._get_model_loader = lambda: _FakeModelLoader(_constant_embedding)
+    recommender._build_weighted_query_vector = lambda **_kwargs: (
+        np.array([1.0, 0.0], dtype=np.float32),
+        "beauty",
+    )
+
+    recommended = recommender.get_recommendations(merchant_id, "p1", k=3)
+    popular = recommender.get_popular_products(merchant_id, category="beauty", k=5)
+    for rec in recommended + popular:
+        rec["tags"].append("mutated by caller")
+
+    assert recommender._merchant_products[merchant_id]["p2"]["tags"] == ["skincare"]
+    again = recommender.get_recommendations(merchant_id, "p1", k=3)
+    cached = recommender.get_popular_products(merchant_id, category="beauty", k=5)
+    assert [rec["tags"] for rec in again] == [["skincare"]]
+    assert [rec["tags"] for rec in cached] == [["skincare"], ["skincare"]]
+
+
+def test_reset_drops_merchants_but_keeps_model_loader():
+    recommender, merchant_id = _make_recommender_with_products()
+    model_loader = recommender._model_loader
+    assert recommender.get_popular_products(merchant_id, category="beauty", k=5)
+
+    recommender.reset()
+
+    assert recommender._model_loader is model_loader
+    assert not recommender._merchant_products
+    assert not recommender._merchant_indexes
+    assert not recommender._popular_cache
+    assert recommender.get_popular_products(merchant_id, category="beauty", k=5) == []
+
+
+def test_embedding_cache_is_lru_bounded_and_cleared_by_reset(monkeypatch):
+    import src.recommender as recommender_module
+
+    monkeypatch.setattr(recommender_module, "EMBEDDING_CACHE_MAX_ENTRIES", 2)
+    recommender = ProductRecommender()
+    calls = []
+
+    def get_embedding(rep):
+        calls.append(rep)
+        return np.ones(2, dtype=np.float32)
+
+    model_loader = _FakeModelLoader(get_embedding)
+    for rep in ("a", "b", "a", "c", "a"):
+        recommender._get_embedding(model_loader, rep)
+
+    assert calls == ["a", "b", "c"]
+    assert list(recommender._embedding_cache) == ["c", "a"]
+
+    recommender.reset()
+    assert not recommender._embedding_cache
+
+
+def test_reindexing_publishes_a_new_snapshot_and_leaves_the_old_one_intact():
+    recommender, merchant_id = _make_recommender_with_products()
+    old = recommender._merchant_index(merchant_id)
+
+    del recommender._merchant_products[merchant_id]["p2"]
+    recommender._index_merchant_products(merchant_id)
+    new = recommender._merchant_index(merchant_id)
+
+    assert new is not old
+    assert new.version == old.version + 1
+    assert new.product_ids == ["p1", "p3"]
+    # A request still holding the old snapshot sees consistent arrays
+    assert old.product_ids == ["p1", "p2", "p3"]
+    assert len(old.products) == len(old.matrix) == len(old.filter_columns["price"]) == 3
+    assert old.category_rows["beauty"].tolist() == [0, 1]
+
+
+def test_recommendations_are_ranked_and_truncated_to_k():
+    recommender, merchant_id = _make_recommender_with_products()
+
+    embeddings = {
+        "rep-beauty-1": np.array([1.0, 0.0]),
+        "rep-beauty-2": np.array([0.8, 0.6]),
+        "rep-electronics-1": np.array([0.6, 0.8]),
+    }
+
+    recommender._build_weighted_query_vector = lambda **_kwargs: (
+        np.array([1.0, 0.0], dtype=float),
+        "beauty",
+    )
+    recommender._get_model_loader = lambda: _FakeModelLoader(embeddings.get)
+
+    merchant_settings = {
+        "filters": {
+            "sameCategoryOnly": False,
+            "priceProximity": {"enabled": False},
+            "tagBoost": {"enabled": False},
+        }
+    }
+
+    top_one = recommender.get_recommendations(
+        merchant_id=merchant_id,
+        current_product_id="p1",
+        k=1,
+        merchant_settings=merchant_settings,
+    )
+    top_all = recommender.get_recommendations(
+        merchant_id=merchant_id,
+        current_product_id="p1",
+        k=5,
+        merchant_settings=merchant_settings,
+    )
+
+    assert [r["shopify_product_id"] for r in top_one] == ["p2"]
+    assert [r["shopify_product_id"] for r in top_all] == ["p2", "p3"]
+    assert [r["score"] for r in top_all] == [0.8, 0.6]
+
+
+def test_vectorized_tag_boost_matches_scalar_jaccard():
+    recommender, merchant_id = _make_recommender_with_products()
+    products = recommender._merchant_products[merchant_id]
+    products["p1"]["tags"] = ["Skincare", "vegan", "organic"]
+    products["p2"]["tags"] = ["skincare", "organic"]
+    products["p3"]["tags"] = []
+
+    recommender._get_model_loader = lambda: _FakeModelLoader(lambda _rep: None)
+    index = recommender._merchant_index(merchant_id)
+
+    rows = np.arange(len(products), dtype=np.int32)
+    boosts = recommender._compute_tag_boost_vector(index, "p1", rows)
+    expected = [
+        recommender._compute_tag_boost(products["p1"], products[pid])
+        for pid in index.product_ids
+    ]
+
+    np.testing.assert_allclose(boosts, expected, rtol=1e-6)
+
+
+def test_negative_tag_boost_weight_matches_unpruned_ranking():
+    rng = np.random.default_rng(1)
+    embeddings = {f"rep-{i}": rng.normal(size=8) for i in range(40)}
+    query = embeddings["rep-0"] / np.linalg.norm(embeddings["rep-0"])
+    recommender, merchant_id = _make_recommender_with_catalog(40, embeddings, query)
+    # Every even product shares the current product's tag, so a negative
+    # weight penalizes the rows that would otherwise rank highest
+    for i, product in enumerate(recommender._merchant_products[merchant_id].values()):
+        product["tags"] = ["skincare"] if i % 2 == 0 else ["other"]
+    merchant_settings = {
+        "filters": {
+            "sameCategoryOnly": False,
+            "priceProximity": {"enabled": True},
+            "tagBoost": {"enabled": True, "weight": -1.0},
+        }
+    }
+
+    def recommend(k):
+        return recommender.get_recommendations(
+            merchant_id=merchant_id,
+            current_product_id="p0",
+            k=k,
+            merchant_settings=merchant_settings,
+        )
+
+    # k larger than the candidate set never prunes
+    unpruned = recommend(100)[:5]
+    top_five = recommend(5)
+
+    assert [r["shopify_product_id"] for r in top_five] == [
+        r["shopify_product_id"] for r in unpruned
+    ]
+    assert [r["score"] for r in top_five] == [r["score"] for r in unpruned]
+
+
+def test_match_fields_are_precomputed_at_indexing():
+    recommender, merchant_id = _make_recommender_with_products()
+    products = recommender._merchant_products[merchant_id]
+    products["p1"]["tags"] = " Vegan-Friendly, Organic ,"
+
+    recommender._get_model_loader = lambda: _FakeModelLoader(lambda _rep: None)
+    recommender._merchant_index(merchant_id)
+
+    assert products["p1"]["_tag_set"] == frozenset({"vegan-friendly", "organic"})
+    assert recommender._normalized_tag_set(products["p1"]) is products["p1"]["_tag_set"]
+    # Substring matching still sees the precomputed text
+    assert apply_all_filters(
+        [products["p1"]], user_preferences={"vegan": True}
+    ) == [products["p1"]]
+
+
+def test_filter_trace_logs_only_configured_product(monkeypatch, caplog):
+    import src.filters as filters
+
+    products = [
+        {"id": "beauty-1", "category": "beauty", "tags": []},
+        {"id": "electronics-1", "category": "electronics", "tags": []},
+    ]
+
+    with caplog.at_level("INFO", logger="src.filters"):
+        apply_all_filters(products=products, target_category="beauty")
+    assert "DROPPED" not in caplog.text
+
+    monkeypatch.setattr(filters, "DEBUG_TRACE_PRODUCT_ID", "electronics-1")
+    with caplog.at_level("INFO", logger="src.filters"):
+        apply_all_filters(products=products, target_category="beauty")
+    assert "DROPPED by Category Filter (Target: beauty)" in caplog.text
+
+
+def test_filter_stage_counts_are_logged_for_mask_and_predicate_stages(caplog):
+    from src.filters import build_filter_columns
+
+    products = [
+        {"id": "coat", "category": "beauty", "title": "Wool coat", "tags": []},
+        {"id": "tee", "category": "beauty", "tags": ["vegan"]},
+        {"id": "tv", "category": "electronics", "tags": []},
+    ]
+
+    for columns in (None, build_filter_columns(products)):
+        caplog.clear()
+        with caplog.at_level("DEBUG", logger="src.filters"):
+            apply_all_filters(
+                products=products,
+                target_category="beauty",
+                user_location="PK",
+                user_preferences={"vegan": True},
+                columns=columns,
+            )
+        assert "Category Filter (Target: beauty): 3 → 2 products" in caplog.text
+        assert "Location Filter (UserLoc: PK): 2 → 1 products" in caplog.text
+        assert "Ethical/Price Filters: 1 → 1 products" in caplog.text
+
+
+def test_recommendation_trace_finds_product_by_id(monkeypatch, caplog):
+    import src.recommender as recommender_module
+
+    recommender, merchant_id = _make_recommender_with_products()
+
+    recommender._build_weighted_query_vector = lambda **_kwargs: (
+        np.array([1.0, 0.0], dtype=float),
+        "beauty",
+    )
+    recommender._get_model_loader = lambda: _FakeModelLoader(_constant_embedding)
+    merchant_settings = {"filters": {"sameCategoryOnly": False}}
+
+    monkeypatch.setattr(recommender_module, "DEBUG_TRACE_PRODUCT_ID", "p2")
+    with caplog.at_level("INFO", logger="src.recommender"):
+        recommender.get_recommendations(
+            merchant_id=merchant_id,
+            current_product_id="p1",
+            k=3,
+            merchant_settings=merchant_settings,
+        )
+    assert "Missing Product p2 IS in scored list" in caplog.text
+
+    caplog.clear()
+    monkeypatch.setattr(recommender_module, "DEBUG_TRACE_PRODUCT_ID", "p1")
+    with caplog.at_level("INFO", logger="src.recommender"):
+        recommender.get_recommendations(
+            merchant_id=merchant_id,
+            current_product_id="p1",
+            k=3,
+            merchant_settings=merchant_settings,
+        )
+    assert "Missing Product p1 is NOT in scored list" in caplog.text
+
+
+def test_faiss_shortlist_matches_dense_scoring(monkeypatch):
+    import src.recommender as recommender_module
+
+    rng = np.random.default_rng(0)
+    embeddings = {f"rep-{i}": rng.normal(size=8) for i in range(60)}
+
+    query = rng.normal(size=8)
+    query /= np.linalg.norm(query)
+    merchant_settings = {
+        "filters": {
+            "sameCategoryOnly": False,
+            "priceProximity": {"enabled": False},
+            "tagBoost": {"enabled": False},
+        }
+    }
+
+    def recommend(min_candidates, ivf_min_products=10**9):
+        monkeypatch.setattr(recommender_module, "FAISS_SEARCH_MIN_CANDIDATES", min_candidates)
+        monkeypatch.setattr(recommender_module, "FAISS_IVF_MIN_PRODUCTS", ivf_min_products)
+        recommender, merchant_id = _make_recommender_with_catalog(60, embeddings, query)
+        # Every seventh product has no embedding
+        for i in range(0, 60, 7):
+            recommender._merchant_products[merchant_id][f"p{i}"]["amazon_representatives"] = []
+        return recommender.get_recommendations(
+            merchant_id=merchant_id,
+            current_product_id="p1",
+            k=5,
+            merchant_settings=merchant_settings,
+        )
+
+    dense = recommend(10**9)
+    shortlisted = recommend(1)
+    # Probing every inverted list makes the IVF search exhaustive
+    monkeypatch.setattr(recommender_module, "FAISS_IVF_NPROBE", 10**6)
+    ivf_shortlisted = recommend(1, ivf_min_products=1)
+
+    # fp16 codes only steer the shortlist; final scores come from float32
+    monkeypatch.setattr(recommender_module, "FAISS_SCALAR_QUANTIZER", "fp16")
+    fp16_shortlisted = recommend(1)
+
+    for results in (shortlisted, ivf_shortlisted, fp16_shortlisted):
+        assert [r["shopify_product_id"] for r in results] == [
+            r["shopify_product_id"] for r in dense
+        ]
+        assert [r["score"] for r in results] == [r["score"] for r in dense]
+
+
+def test_ranking_only_reads_product_dicts_for_the_current_product_and_top_k():
+    rng = np.random.default_rng(2)
+    embeddings = {f"rep-{i}": rng.normal(size=8) for i in range(40)}
+
+    class _RecordingList(list):
+        def __init__(self, items):
+            super().__init__(items)
+            self.read = set()
+
+        def __getitem__(self, row):
+            self.read.add(int(row))
+            return super().__getitem__(row)
+
+    query = embeddings["rep-0"] / np.linalg.norm(embeddings["rep-0"])
+    recommender, merchant_id = _make_recommender_with_catalog(40, embeddings, query)
+    for i, product in enumerate(recommender._merchant_products[merchant_id].values()):
+        product["tags"] = ["skincare"] if i % 2 == 0 else ["other"]
+        product["price"] = str(20 + i)
+    index = recommender._merchant_index(merchant_id)
+    products = _RecordingList(index.products)
+    recommender._merchant_indexes[merchant_id] = index._replace(products=products)
+    merchant_settings = {"filters": {"sameCategoryOnly": False}}
+
+    results = recommender.get_recommendations(
+        merchant_id=merchant_id,
+        current_product_id="p0",
+        k=3,
+        merchant_settings=merchant_settings,
+    )
+    returned_rows = {index.positions[r["shopify_product_id"]] for r in results}
+
+    assert len(results) == 3
+    assert products.read <= returned_rows | {index.positions["p0"]}
+
+    products.read.clear()
+    assert len(recommender.get_popular_products(
+        merchant_id, k=3, merchant_settings=merchant_settings
+    )) == 3
+    assert products.read == set()
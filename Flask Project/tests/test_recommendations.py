@@ -11,6 +11,8 @@ This module tests:
    - Only vegan products when preference set
 """
 
+import logging
+import os
 import pytest
 import sys
 from pathlib import Path
@@ -26,92 +28,61 @@ from src.filters import (
     apply_category_filter,
     apply_all_filters
 )
-
+from tests._data import (
+    API_MERCHANT_ID,
+    POPULAR_BODY,
+    RECOMMEND_BODY,
+    REGISTER_AND_RECOMMEND_BODY,
+    REGISTER_BODY,
+    SAMPLE_PRODUCTS,
+    SAMPLE_PRODUCTS_MIN,
+    TEST_MERCHANT_ID,
+    OrjsonProvider,
+    dump_json
+)
 
 # =============================================================================
-# TEST DATA
+# FIXTURES
 # =============================================================================
 
-SAMPLE_PRODUCTS = [
-    {
-        "id": "shop_001",
-        "title": "Organic Moisturizing Face Cream",
-        "product_type": "Beauty",
-        "tags": ["skincare", "vegan", "organic"],
-        "price": "29.99",
-        "image": "https://example.com/cream.jpg"
-    },
-    {
-        "id": "shop_002",
-        "title": "Anti-Aging Vitamin C Serum",
-        "product_type": "Beauty",
-        "tags": ["skincare", "anti-aging", "vegan"],
-        "price": "39.99",
-        "image": "https://example.com/serum.jpg"
-    },
-    {
-        "id": "shop_003",
-        "title": "Hydrating Eye Cream",
-        "product_type": "Beauty",
-        "tags": ["skincare", "hydrating"],
-        "price": "24.99",
-        "image": "https://example.com/eye-cream.jpg"
-    },
-    {
-        "id": "shop_004",
-        "title": "Winter Wool Coat",
-        "product_type": "Fashion",
-        "tags": ["winter", "coat", "clothing", "wool"],
-        "price": "199.99",
-        "image": "https://example.com/coat.jpg"
-    },
-    {
-        "id": "shop_005",
-        "title": "Summer Cotton Dress",
-        "product_type": "Fashion",
-        "tags": ["summer", "dress", "clothing", "cotton"],
-        "price": "49.99",
-        "image": "https://example.com/dress.jpg"
-    },
-    {
-        "id": "shop_006",
-        "title": "iPhone 15 Pro Case",
-        "product_type": "Electronics",
-        "tags": ["phone", "accessory", "case", "iphone"],
-        "price": "24.99",
-        "image": "https://example.com/case.jpg"
-    },
-    {
-        "id": "shop_007",
-        "title": "Wireless Bluetooth Earbuds",
-        "product_type": "Electronics",
-        "tags": ["audio", "wireless", "bluetooth"],
-        "price": "79.99",
-        "image": "https://example.com/earbuds.jpg"
-    },
-    {
-        "id": "shop_008",
-        "title": "Eco-Friendly Bamboo Utensil Set",
-        "product_type": "Home",
-        "tags": ["kitchen", "sustainable", "eco-friendly", "bamboo"],
-        "price": "19.99",
-        "image": "https://example.com/utensils.jpg"
-    }
-]
-
-TEST_MERCHANT_ID = "test-store.myshopify.com"
-
+@pytest.fixture(scope="session")
+def shared_recommender():
+    """One recommender (and model loader) shared by the whole session."""
+    # Create new instance (bypass singleton for testing)
+    return ProductRecommender()
 
-# =============================================================================
-# FIXTURES
-# =============================================================================
 
 @pytest.fixture
-def recommender():
-    """Create a fresh recommender instance for testing."""
-    # Create new instance (bypass singleton for testing)
-    rec = ProductRecommender()
-    return rec
+def recommender(shared_recommender):
+    """Recommender with no merchants registered, reset for each test."""
+    shared_recommender.reset()
+    return shared_recommender
+
+
+@pytest.fixture(scope="session")
+def app(warm_app):
+    """Flask app built once for the whole session."""
+    # Merchant data lives only in the recommender's in-memory dicts, so
+    # the warmed-up TESTING app (see conftest) is all the suite needs
+    app = warm_app
+    
+    # Skip per-response key sorting and request logging the tests never read
+    if OrjsonProvider is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        app.json.sort_keys = False
+        app.json.compact = True
+    app.logger.disabled = True
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """Flask test client on the shared app."""
+    # Not used as a context manager: that would keep the last request
+    # context alive across tests
+    return app.test_client()
 
 
 @pytest.fixture
@@ -215,6 +186,17 @@ class TestMerchantRegistration:
         assert categories.get("electronics", 0) == 2  # 2 electronics products
         assert categories.get("home", 0) == 1  # 1 home product
     
+    def test_register_normalizes_tags_to_list(self, recommender):
+        """Comma-separated tags should be stored as a list of stripped tags."""
+        recommender.register_merchant_products(TEST_MERCHANT_ID, [
+            {"id": "csv_001", "title": "Face Cream", "tags": " Vegan, Skincare ,, "},
+            {"id": "none_001", "title": "Desk Lamp", "tags": None},
+        ])
+        
+        products = {p["id"]: p for p in recommender.get_merchant_products(TEST_MERCHANT_ID)}
+        assert products["csv_001"]["tags"] == ["Vegan", "Skincare"]
+        assert products["none_001"]["tags"] == []
+    
     def test_get_merchant_products(self, registered_recommender):
         """Should retrieve all registered products."""
         products = registered_recommender.get_merchant_products(TEST_MERCHANT_ID)
@@ -549,11 +531,8 @@ class TestRecommendations:
         
         # All beauty recs should be vegan
         for rec in recs:
-            tags = rec.get("tags", [])
-            if isinstance(tags, str):
-                tags = [t.strip().lower() for t in tags.split(",")]
-            else:
-                tags = [str(t).lower() for t in tags]
+            # Registration stores tags as a list
+            tags = [tag.lower() for tag in rec.get("tags", [])]
             
             # Check for vegan-related tags
             has_vegan = any(
@@ -576,100 +555,153 @@ class TestRecommendations:
             assert p.get("category") == "beauty"
 
 
+# =============================================================================
+# TEST: REQUEST VALIDATION
+# =============================================================================
+
+class TestRequestValidation:
+    """Tests for the API payload validators, called without HTTP dispatch."""
+    
+    def test_missing_merchant_id(self):
+        """Request without merchant_id should return 400."""
+        from api.app import validate_and_recommend
+        
+        body, status = validate_and_recommend({
+            "current_product_id": "shop_001"
+        })
+        
+        assert status == 400
+        assert body["success"] is False
+    
+    @pytest.mark.parametrize("payload", [
+        None,
+        {},
+        {"current_product_id": "shop_001"},
+        {"merchant_id": "", "current_product_id": "shop_001"},
+        {"merchant_id": API_MERCHANT_ID, "k": "five"},
+        {"merchant_id": API_MERCHANT_ID, "k": None},
+    ])
+    def test_invalid_recommend_payload(self, payload):
+        """Invalid recommend payloads should be rejected with 400."""
+        from api.app import validate_recommend_payload
+        
+        error = validate_recommend_payload(payload)
+        
+        assert error is not None
+        assert error[1] == 400
+    
+    def test_valid_recommend_payload(self):
+        """A payload with merchant_id and a numeric k should pass."""
+        from api.app import validate_recommend_payload
+        
+        assert validate_recommend_payload({"merchant_id": API_MERCHANT_ID, "k": "5"}) is None
+
+
 # =============================================================================
 # TEST: API INTEGRATION
 # =============================================================================
 
+@pytest.mark.xdist_group("api_integration")
 class TestAPIIntegration:
     """Integration tests for Flask API."""
     
-    @pytest.fixture
-    def client(self):
-        """Create Flask test client."""
-        from api.app import create_app
-        app = create_app()
-        app.config["TESTING"] = True
-        with app.test_client() as client:
-            yield client
+    # With pytest-xdist and --dist loadgroup, these tests run on one worker
+    # so the session-scoped app and client are built only once
+    #
+    # The test app renders compact JSON, so tests that only check a field
+    # is present search the raw body and don't decode it
+    
+    @pytest.fixture(autouse=True, scope="class")
+    def registered_merchant(self, client):
+        """Register SAMPLE_PRODUCTS_MIN through the API once for the class."""
+        client.post(
+            "/api/merchant/register",
+            data=REGISTER_BODY,
+            content_type="application/json"
+        )
+    
+    @pytest.fixture(autouse=True)
+    def app_context(self, app):
+        """Fresh app context per test on the shared app."""
+        with app.app_context():
+            yield
     
     def test_health_endpoint(self, client):
         """Health endpoint should return 200."""
         response = client.get("/health")
         assert response.status_code == 200
-        data = response.get_json()
-        assert data["status"] == "healthy"
+        assert b'"status":"healthy"' in response.data
     
     def test_register_endpoint(self, client):
         """Register endpoint should accept products."""
         response = client.post(
             "/api/merchant/register",
-            json={
-                "merchant_id": "test-api-store",
-                "products": SAMPLE_PRODUCTS
-            }
+            data=REGISTER_BODY,
+            content_type="application/json"
         )
         
         assert response.status_code == 200
         data = response.get_json()
         assert data["success"] is True
-        assert data["registered"] == len(SAMPLE_PRODUCTS)
+        assert data["registered"] == len(SAMPLE_PRODUCTS_MIN)
     
     def test_recommend_endpoint(self, client):
         """Recommend endpoint should return recommendations."""
-        # First register products
-        client.post(
-            "/api/merchant/register",
-            json={
-                "merchant_id": "test-api-store",
-                "products": SAMPLE_PRODUCTS
-            }
+        response = client.post(
+            "/api/recommend",
+            data=RECOMMEND_BODY,
+            content_type="application/json"
         )
         
-        # Then get recommendations
+        assert response.status_code == 200
+        assert b'"success":true' in response.data
+        assert b'"recommendations":' in response.data
+    
+    def test_register_and_recommend_endpoint(self, client):
+        """Combined endpoint should register and recommend in one request."""
         response = client.post(
-            "/api/recommend",
-            json={
-                "merchant_id": "test-api-store",
-                "current_product_id": "shop_001",
-                "user_location": "Pakistan",
-                "user_preferences": {"vegan": True},
-                "k": 5
-            }
+            "/api/merchant/register_and_recommend",
+            data=REGISTER_AND_RECOMMEND_BODY,
+            content_type="application/json"
         )
         
         assert response.status_code == 200
         data = response.get_json()
         assert data["success"] is True
+        assert data["registered"] == len(SAMPLE_PRODUCTS_MIN)
         assert "recommendations" in data
+        assert data["count"] == len(data["recommendations"])
     
-    def test_popular_endpoint(self, client):
-        """Popular endpoint should return products."""
-        # First register products
-        client.post(
-            "/api/merchant/register",
-            json={
-                "merchant_id": "test-api-store",
-                "products": SAMPLE_PRODUCTS
-            }
+    @pytest.mark.parametrize("query", [["shop_001"], "shop_001", 5])
+    def test_register_and_recommend_rejects_non_object_query(self, client, query):
+        """A query that isn't a JSON object should return 400, not 500."""
+        response = client.post(
+            "/api/merchant/register_and_recommend",
+            data=dump_json({
+                "merchant_id": API_MERCHANT_ID,
+                "products": SAMPLE_PRODUCTS_MIN,
+                "query": query
+            }),
+            content_type="application/json"
         )
         
-        # Get popular products
+        assert response.status_code == 400
+        assert b'"success":false' in response.data
+    
+    def test_popular_endpoint(self, client):
+        """Popular endpoint should return products."""
         response = client.post(
             "/api/popular",
-            json={
-                "merchant_id": "test-api-store",
-                "category": "beauty",
-                "k": 5
-            }
+            data=POPULAR_BODY,
+            content_type="application/json"
         )
         
         assert response.status_code == 200
-        data = response.get_json()
-        assert data["success"] is True
-        assert "products" in data
+        assert b'"success":true' in response.data
+        assert b'"products":' in response.data
     
     def test_missing_merchant_id(self, client):
-        """Request without merchant_id should return 400."""
+        """Recommend endpoint should turn a validation error into a 400."""
         response = client.post(
             "/api/recommend",
             json={
@@ -678,8 +710,7 @@ class TestAPIIntegration:
         )
         
         assert response.status_code == 400
-        data = response.get_json()
-        assert data["success"] is False
+        assert b'"success":false' in response.data
 
 
 # =============================================================================
@@ -687,4 +718,12 @@ class TestAPIIntegration:
 # =============================================================================
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v", "--tb=short"])
+    # Quiet output and one-line tracebacks by default; set CI_VERBOSE for -v
+    pytest.main([
+        __file__,
+        "-v" if os.getenv("CI_VERBOSE") else "-q",
+        "--tb=line",
+        "-n", "auto",
+        "--dist", "loadgroup",
+        "-p", "no:cacheprovider"
+    ])
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from src import scoring_kernel
+from src.scoring_kernel import score_candidates, top_k_indices
+
+
+def _random_catalog(n=200, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(n, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    has_vector = rng.random(n) > 0.2
+    matrix[~has_vector] = 0.0
+    query = rng.normal(size=dim).astype(np.float32)
+    query /= np.linalg.norm(query)
+    rows = rng.permutation(n)[: n // 2].astype(np.int32)
+    return matrix, rows, query, has_vector
+
+
+def test_numpy_fallback_scores_and_cutoff():
+    matrix, rows, query, has_vector = _random_catalog()
+
+    scores, boostable = scoring_kernel._score_candidates_numpy(
+        matrix, rows, query, has_vector, 0.1
+    )
+
+    expected = np.where(has_vector[rows], matrix[rows] @ query, 0.1)
+    np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-6)
+    assert np.array_equal(boostable, has_vector[rows] & (expected >= 0.1))
+
+
+def test_numpy_fallback_full_matrix_path_matches_gather():
+    matrix, _, query, has_vector = _random_catalog()
+    rows = np.arange(len(matrix) - 3, dtype=np.int32)[::-1]
+
+    scores, _ = scoring_kernel._score_candidates_numpy(
+        matrix, rows, query, has_vector, 0.1
+    )
+
+    expected = np.where(has_vector[rows], matrix[rows] @ query, 0.1)
+    np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.skipif(not scoring_kernel.NUMBA_AVAILABLE, reason="numba not installed")
+def test_numba_kernel_matches_numpy():
+    matrix, rows, query, has_vector = _random_catalog()
+
+    jit_scores, jit_boostable = score_candidates(matrix, rows, query, has_vector, 0.1)
+    np_scores, np_boostable = scoring_kernel._score_candidates_numpy(
+        matrix, rows, query, has_vector, 0.1
+    )
+
+    np.testing.assert_allclose(jit_scores, np_scores, rtol=1e-5, atol=1e-6)
+    # Only values right at the cutoff may round differently
+    near_cutoff = np.abs(np_scores - 0.1) < 1e-5
+    assert np.array_equal(jit_boostable[~near_cutoff], np_boostable[~near_cutoff])
+
+
+def test_top_k_indices_orders_by_score_and_keeps_ties_stable():
+    scores = np.array([0.2, 0.9, 0.5, 0.9, 0.1, 0.5], dtype=np.float32)
+    candidates = np.array([0, 1, 2, 3, 5], dtype=np.int64)
+
+    assert top_k_indices(scores, candidates, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, candidates, 10).tolist() == [1, 3, 2, 5, 0]
+
+
+def test_top_k_indices_breaks_ties_at_the_cutoff_by_candidate_order():
+    scores = np.zeros(200, dtype=np.float32)
+    scores[150] = 1.0
+    candidates = np.arange(200)
+
+    for k in (1, 2, 5, 50):
+        expected = sorted(candidates.tolist(), key=lambda i: -scores[i])[:k]
+        assert top_k_indices(scores, candidates, k).tolist() == expected
+
+
+@pytest.mark.skipif(not scoring_kernel.SIMSIMD_AVAILABLE, reason="simsimd not installed")
+def test_simsimd_cosine_batch_matches_matmul():
+    matrix, _, query, _ = _random_catalog()
+
+    np.testing.assert_allclose(
+        scoring_kernel._cosine_batch(query, matrix), matrix @ query, rtol=1e-5, atol=1e-6
+    )